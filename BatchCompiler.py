@@ -0,0 +1,187 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ParseTree import ParseTree, ParseException
+from CompilerParser import CompilerParser
+from JackTokenizer import JackTokenizer, SOURCE_ENCODING
+
+
+def findSources(paths):
+    """
+    Expand directories into the Jack source files they contain
+    @param paths A directory, a file, or a list of either
+    @return a list of file paths, with each directory's files in sorted order
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".jack"):
+                    sources.append(os.path.join(path, name))
+        else:
+            sources.append(path)
+    return sources
+
+
+def compileFile(path, iterative=False, source=None):
+    """
+    Tokenize and parse one Jack file. Runs inside the worker processes.
+    @param path The file to compile
+    @param iterative Parse with CompilerParser's explicit-stack mode
+    @param source The contents of the file as bytes, if already read
+    @return a BatchResult
+    """
+    start = time.perf_counter()
+    parser = None
+    try:
+        if source is not None:
+            tokens = JackTokenizer(io.StringIO(source.decode(SOURCE_ENCODING)))
+        else:
+            tokens = JackTokenizer(path)
+        parser = CompilerParser(tokens, iterative)
+        tree = parser.compileProgram().toFlat()
+        error = None
+    except (ParseException, OSError, UnicodeDecodeError) as e:
+        tree = None
+        error = str(e) or type(e).__name__
+    except RecursionError:
+        tree = None
+        error = "Nesting too deep for the recursive parser; compile with iterative=True"
+
+    tokens = parser.tokens.position if parser is not None else 0
+    return BatchResult(path, tree, tokens, error, time.perf_counter() - start)
+
+
+class BatchResult():
+
+    def __init__(self, path, tree, tokens, error, seconds):
+        """
+        The outcome of compiling one file
+        @param path The file compiled
+        @param tree The parse tree in ParseTree.toFlat() form, or None if parsing failed
+        @param tokens The number of tokens consumed
+        @param error A description of the failure, or None if parsing succeeded
+        @param seconds Time spent compiling the file
+        """
+        self.path = path
+        self.tree = tree
+        self.tokens = tokens
+        self.error = error
+        self.seconds = seconds
+
+
+    def getTree(self):
+        """
+        Rebuild the parse tree of the file
+        @return a ParseTree, or None if parsing failed
+        """
+        if self.tree is None:
+            return None
+        return ParseTree.fromFlat(self.tree)
+
+
+class BatchReport():
+
+    def __init__(self, results, seconds):
+        """
+        The outcome of a batch compile
+        @param results A BatchResult per file, in the order the files were given
+        @param seconds Wall-clock time of the whole batch
+        """
+        self.results = results
+        self.seconds = seconds
+        self.tokens = sum(result.tokens for result in results)
+        self.errors = [result for result in results if result.error is not None]
+
+
+    def filesPerSecond(self):
+        """
+        @return the number of files compiled per second of wall-clock time
+        """
+        return len(self.results) / self.seconds if self.seconds else 0.0
+
+
+    def tokensPerSecond(self):
+        """
+        @return the number of tokens parsed per second of wall-clock time
+        """
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+
+    def __str__(self):
+        """
+        Summarise the batch
+        @return a one-line summary of files, errors and throughput
+        """
+        return "%d files (%d failed), %d tokens in %.3fs: %.1f files/s, %.0f tokens/s" % (
+            len(self.results), len(self.errors), self.tokens, self.seconds,
+            self.filesPerSecond(), self.tokensPerSecond())
+
+
+class BatchCompiler():
+
+    def __init__(self, workers=None, iterative=False, cache=None):
+        """
+        Compiles many Jack files across a pool of worker processes
+        @param workers Number of worker processes. None uses one per CPU; 0 compiles in this process.
+        @param iterative Parse with CompilerParser's explicit-stack mode
+        @param cache A ParseCache consulted before parsing each file, or None to always parse
+        """
+        self.workers = workers
+        self.iterative = iterative
+        self.cache = cache
+
+
+    def compile(self, paths):
+        """
+        Tokenize and parse every file
+        @param paths A directory, a file, or a list of either
+        @return a BatchReport
+        """
+        sources = findSources(paths)
+        start = time.perf_counter()
+
+        results = [None] * len(sources)
+        pending = list(range(len(sources)))
+        contents = [None] * len(sources)
+        keys = [None] * len(sources)
+
+        if self.cache is not None:
+            pending = []
+            for i, path in enumerate(sources):
+                try:
+                    with open(path, "rb") as file:
+                        contents[i] = file.read()
+                except OSError:
+                    pending.append(i)
+                    continue
+                keys[i] = self.cache.key(contents[i])
+                entry = self.cache.get(keys[i])
+                if entry is None:
+                    pending.append(i)
+                else:
+                    results[i] = BatchResult(path, entry[1], entry[0], None, 0.0)
+
+        paths = [sources[i] for i in pending]
+        iterative = [self.iterative] * len(pending)
+        sourceBytes = [contents[i] for i in pending]
+        if self.workers == 0:
+            compiled = list(map(compileFile, paths, iterative, sourceBytes))
+        else:
+            workers = self.workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(workers) as pool:
+                # Hand files out in batches so small files don't pay one round trip each
+                chunksize = max(1, len(pending) // (workers * 4))
+                compiled = list(pool.map(compileFile, paths, iterative, sourceBytes, chunksize=chunksize))
+
+        for i, result in zip(pending, compiled):
+            results[i] = result
+            if self.cache is not None and keys[i] is not None and result.error is None:
+                self.cache.put(keys[i], (result.tokens, result.tree))
+
+        return BatchReport(results, time.perf_counter() - start)
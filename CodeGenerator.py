@@ -0,0 +1,328 @@
+import io
+
+from SymbolTable import SymbolTable
+
+
+class CodeGenerationException(Exception):
+    """
+    Raised when a parse tree can't be turned into VM code, e.g. it uses an undeclared variable
+    Use this with `raise CodeGenerationException("My error message")`
+    """
+    pass
+
+
+# Binary operator -> VM commands that apply it
+OPERATOR_COMMANDS = {
+    "+": ["add"],
+    "-": ["sub"],
+    "*": ["call Math.multiply 2"],
+    "/": ["call Math.divide 2"],
+    "&": ["and"],
+    "|": ["or"],
+    "<": ["lt"],
+    ">": ["gt"],
+    "=": ["eq"],
+}
+
+UNARY_COMMANDS = {"-": "neg", "~": "not"}
+
+KEYWORD_CONSTANT_COMMANDS = {
+    "true": ["push constant 0", "not"],
+    "false": ["push constant 0"],
+    "null": ["push constant 0"],
+    "this": ["push pointer 0"],
+}
+
+# Symbol kind -> VM memory segment
+SEGMENTS = {"static": "static", "field": "this", "argument": "argument", "local": "local"}
+
+# Node type -> method that turns it into work items
+NODE_HANDLERS = {
+    "statements": "generateChildren",
+    "letStatement": "generateLet",
+    "ifStatement": "generateIf",
+    "whileStatement": "generateWhile",
+    "doStatement": "generateDo",
+    "returnStatement": "generateReturn",
+    "expression": "generateExpression",
+    "expressionList": "generateChildren",
+    "term": "generateTerm",
+}
+
+
+class CodeGenerator():
+
+    def __init__(self, stream, symbols=None):
+        """
+        Writes Hack VM code for parse trees built by CompilerParser.
+        Each subroutine's code is written to the stream as soon as it is generated,
+        so only one subroutine is held in memory at a time.
+        @param stream A text file-like object to write VM commands to
+        @param symbols The SymbolTable filled in by a CompilerParser created with symbols=True,
+                       or None to collect declarations from the tree
+        """
+        self.stream = stream
+        self.symbols = symbols
+        self.ownSymbols = symbols is None
+        self.className = None
+        self.subroutineName = None
+        self.labelCounts = {}
+
+
+    def generate(self, tree):
+        """
+        Write the VM code for a class
+        @param tree The class's parse tree: a ParseTree, ArenaNode or TreeFileNode
+        """
+        children = tree.getChildren()
+        self.className = children[1].value
+        if self.ownSymbols:
+            self.symbols = SymbolTable()
+            self.symbols.startClass(self.className)
+
+        for child in children:
+            if child.node_type == "classVarDec":
+                if self.ownSymbols:
+                    self.declare(child.getChildren()[0].value, child)
+            elif child.node_type == "subroutine":
+                self.stream.write("\n".join(self.generateSubroutine(child)))
+                self.stream.write("\n")
+
+
+    def declare(self, kind, declaration):
+        """
+        Add the variables of a classVarDec, parameterList or varDec node to the symbol table
+        @param kind The kind of every variable declared
+        @param declaration The declaration node
+        """
+        varType = None
+        for child in declaration.getChildren():
+            if child.node_type == "keyword" and child.value not in SEGMENTS and child.value != "var":
+                varType = child.value
+            elif child.node_type == "identifier":
+                self.symbols.define(child.value, varType, kind)
+
+
+    def generateSubroutine(self, subroutine):
+        """
+        Generate the VM code for one subroutine, processing its nodes from an explicit work stack.
+        A work item is either a node to expand or a VM command to emit.
+        @param subroutine The subroutine node
+        @return a list of VM commands
+        """
+        children = subroutine.getChildren()
+        kind = children[0].value
+        self.subroutineName = children[2].value
+        self.labelCounts = {}
+
+        body = children[-1]
+        if self.ownSymbols:
+            self.symbols.startSubroutine(self.subroutineName, kind)
+            for child in children:
+                if child.node_type == "parameterList":
+                    self.declare("argument", child)
+            for child in body.getChildren():
+                if child.node_type == "varDec":
+                    self.declare("local", child)
+
+        locals = self.symbols.varCount("local", self.subroutineName)
+        lines = ["function %s.%s %d" % (self.className, self.subroutineName, locals)]
+        if kind == "constructor":
+            lines.append("push constant %d" % self.symbols.varCount("field"))
+            lines.append("call Memory.alloc 1")
+            lines.append("pop pointer 0")
+        elif kind == "method":
+            lines.append("push argument 0")
+            lines.append("pop pointer 0")
+
+        stack = [child for child in reversed(body.getChildren()) if child.node_type == "statements"]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                lines.append(item)
+                continue
+            handler = NODE_HANDLERS.get(item.node_type)
+            if handler is None:
+                raise CodeGenerationException("Can't generate code for " + item.node_type)
+            items = getattr(self, handler)(item)
+            items.reverse()
+            stack.extend(items)
+
+        return lines
+
+
+    def newLabels(self, prefix, *names):
+        """
+        Make labels for one statement, numbered per subroutine
+        @param prefix The label's group, e.g. "IF"
+        @param names Suffixes of the labels to make
+        @return the labels, e.g. IF_TRUE0
+        """
+        count = self.labelCounts.get(prefix, 0)
+        self.labelCounts[prefix] = count + 1
+        return ["%s_%s%d" % (prefix, name, count) for name in names]
+
+
+    def variable(self, name):
+        """
+        @param name A variable name
+        @return the segment and index where the variable lives, e.g. "local 0"
+        """
+        symbol = self.symbols.lookup(name, self.subroutineName)
+        if symbol is None:
+            raise CodeGenerationException("Undeclared variable " + name + " in " + self.className + "." + self.subroutineName)
+        return "%s %d" % (SEGMENTS[symbol.kind], symbol.index)
+
+
+    def generateChildren(self, node):
+        """
+        @return work items for the non-terminal children of a node, in order
+        """
+        return [child for child in node.getChildren() if child.value is None]
+
+
+    def generateLet(self, node):
+        """
+        @return work items for a let statement
+        """
+        children = node.getChildren()
+        target = self.variable(children[1].value)
+        if children[2].value == "[":
+            # Save the value while the element's address goes into pointer 1
+            return ["push " + target, children[3], "add", children[6],
+                    "pop temp 0", "pop pointer 1", "push temp 0", "pop that 0"]
+        return [children[3], "pop " + target]
+
+
+    def generateIf(self, node):
+        """
+        @return work items for an if statement
+        """
+        trueLabel, falseLabel, endLabel = self.newLabels("IF", "TRUE", "FALSE", "END")
+        children = node.getChildren()
+        items = [children[2], "if-goto " + trueLabel, "goto " + falseLabel, "label " + trueLabel]
+        hasElse = False
+        for child in children[5:]:
+            if child.node_type == "statements":
+                items.append(child)
+            elif child.value == "else":
+                hasElse = True
+                items.append("goto " + endLabel)
+                items.append("label " + falseLabel)
+        if hasElse:
+            items.append("label " + endLabel)
+        else:
+            items.append("label " + falseLabel)
+        return items
+
+
+    def generateWhile(self, node):
+        """
+        @return work items for a while statement
+        """
+        startLabel, endLabel = self.newLabels("WHILE", "EXP", "END")
+        children = node.getChildren()
+        items = ["label " + startLabel, children[2], "not", "if-goto " + endLabel]
+        for child in children[5:]:
+            if child.node_type == "statements":
+                items.append(child)
+        items.append("goto " + startLabel)
+        items.append("label " + endLabel)
+        return items
+
+
+    def generateDo(self, node):
+        """
+        @return work items for a do statement, discarding the value of its call
+        """
+        return [node.getChildren()[1], "pop temp 0"]
+
+
+    def generateReturn(self, node):
+        """
+        @return work items for a return statement; a void return returns 0
+        """
+        children = node.getChildren()
+        if children[1].value is None:
+            return [children[1], "return"]
+        return ["push constant 0", "return"]
+
+
+    def generateExpression(self, node):
+        """
+        @return work items for an expression, applying each operator after both its operands
+        """
+        children = node.getChildren()
+        if children[0].node_type == "keyword":
+            # The placeholder expression `skip`
+            return ["push constant 0"]
+        items = [children[0]]
+        for i in range(1, len(children), 2):
+            items.append(children[i + 1])
+            items.extend(OPERATOR_COMMANDS[children[i].value])
+        return items
+
+
+    def generateTerm(self, node):
+        """
+        @return work items for a term
+        """
+        children = node.getChildren()
+        first = children[0]
+        tokenType = first.node_type
+
+        if tokenType == "integerConstant":
+            return ["push constant " + first.value]
+        if tokenType == "stringConstant":
+            items = ["push constant %d" % len(first.value), "call String.new 1"]
+            for character in first.value:
+                items.append("push constant %d" % ord(character))
+                items.append("call String.appendChar 2")
+            return items
+        if tokenType == "keyword":
+            return list(KEYWORD_CONSTANT_COMMANDS[first.value])
+        if tokenType == "symbol":
+            if first.value == "(":
+                return [children[1]]
+            return [children[1], UNARY_COMMANDS[first.value]]
+
+        if len(children) == 1:
+            return ["push " + self.variable(first.value)]
+        if children[1].value == "[":
+            return ["push " + self.variable(first.value), children[2], "add", "pop pointer 1", "push that 0"]
+        return self.generateCall(children)
+
+
+    def generateCall(self, children):
+        """
+        @param children The children of a term holding a subroutine call
+        @return work items for the call
+        """
+        expressionList = children[-2]
+        arguments = sum(1 for child in expressionList.getChildren() if child.node_type == "expression")
+
+        if children[1].value == "(":
+            # A method of this object
+            return ["push pointer 0", expressionList,
+                    "call %s.%s %d" % (self.className, children[0].value, arguments + 1)]
+
+        name = children[0].value
+        symbol = self.symbols.lookup(name, self.subroutineName)
+        if symbol is None:
+            # A function or constructor of a class
+            return [expressionList, "call %s.%s %d" % (name, children[2].value, arguments)]
+        # A method of the object in a variable
+        return ["push %s %d" % (SEGMENTS[symbol.kind], symbol.index), expressionList,
+                "call %s.%s %d" % (symbol.type, children[2].value, arguments + 1)]
+
+
+def generateVM(tree, symbols=None):
+    """
+    Generate the VM code for a class
+    @param tree The class's parse tree
+    @param symbols The parser's SymbolTable, or None to collect declarations from the tree
+    @return the VM code as a string
+    """
+    stream = io.StringIO()
+    CodeGenerator(stream, symbols).generate(tree)
+    return stream.getvalue()
@@ -0,0 +1,379 @@
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from ParseTree import ParseTree, ParseException, Diagnostic, makeToken
+from CompilerParser import CompilerParser
+from JackTokenizer import JackTokenizer
+from ParseCache import ParseCache
+
+
+# Requests read from one connection but not yet answered; reading pauses when this many are open
+MAX_PIPELINED = 64
+
+
+def describeDiagnostic(diagnostic):
+    """
+    @param diagnostic A Diagnostic
+    @return the diagnostic as a JSON-ready dict
+    """
+    found = diagnostic.found
+    return {
+        "tokenIndex": diagnostic.tokenIndex,
+        "expected": list(diagnostic.expected),
+        "found": None if found is None else [found.node_type, found.value],
+        "message": diagnostic.message,
+    }
+
+
+def compileRequest(source, tokens, iterative):
+    """
+    Tokenize and parse one request's payload. Runs inside the worker processes.
+    @param source Jack source code as a string, or None if tokens are given
+    @param tokens A list of [type, value] pairs, or None if source is given
+    @param iterative Parse with CompilerParser's explicit-stack mode
+    @return a (token count, flat tree, diagnostics) triple; the tree is None if there were any diagnostics
+    """
+    if tokens is None:
+        tokens = JackTokenizer(io.StringIO(source))
+    else:
+        tokens = [makeToken(tokenType, value) for tokenType, value in tokens]
+
+    parser = CompilerParser(tokens, iterative, recover=True)
+    try:
+        tree = parser.compileProgram()
+    except ParseException as e:
+        # Raised by the tokenizer, which doesn't recover
+        parser.diagnostics.append(Diagnostic.fromException(e))
+        tree = None
+
+    diagnostics = [describeDiagnostic(diagnostic) for diagnostic in parser.diagnostics]
+    if diagnostics or tree is None:
+        return (parser.tokens.position, None, diagnostics)
+    return (parser.tokens.position, tree.toFlat(), [])
+
+
+def validTokens(tokens):
+    """
+    @param tokens The tokens of a request, as decoded from JSON
+    @return True if they are a list of [type, value] string pairs
+    """
+    return isinstance(tokens, list) and all(
+        isinstance(token, list) and len(token) == 2 and isinstance(token[0], str) and isinstance(token[1], str)
+        for token in tokens)
+
+
+def findRequestId(line):
+    """
+    @param line One request, as a JSON-encoded line
+    @return the request's id, or None if it has none
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request.get("id") if isinstance(request, dict) else None
+
+
+def renderText(flat):
+    """
+    @param flat A tree in ParseTree.toFlat() form
+    @return the tree in ParseTree's text form
+    """
+    return str(ParseTree.fromFlat(flat))
+
+
+class CompileServer():
+
+    def __init__(self, path, workers=None, cache=None):
+        """
+        A long-running parser service on a Unix socket, so clients don't pay interpreter and
+        import startup per compile. Requests and responses are one JSON object per line.
+        A request is {"id": any, "source": "..."} or {"id": any, "tokens": [[type, value], ...]},
+        optionally with "format": "flat" (the default) or "text", and "iterative": true.
+        {"id": any, "op": "stats"} returns cache counters.
+        Responses carry the request's id and may arrive out of order, so a client can pipeline
+        many requests on one connection.
+        @param path The socket path to listen on
+        @param workers Number of worker processes. None uses one per CPU; 0 parses in the server process.
+        @param cache The ParseCache shared by all requests, or None for an in-memory one
+        """
+        self.path = path
+        self.workers = workers
+        self.cache = cache if cache is not None else ParseCache()
+        self.pool = None
+        self.server = None
+        # Cache key -> future of a parse in progress, so identical concurrent requests share it
+        self.inflight = {}
+        self.requests = 0
+
+
+    async def start(self):
+        """
+        Start the worker pool and listen on the socket
+        """
+        if self.workers != 0:
+            self.pool = ProcessPoolExecutor(self.workers or os.cpu_count() or 1)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = await asyncio.start_unix_server(self.handleConnection, self.path, limit=2 ** 26)
+
+
+    async def serveForever(self):
+        """
+        Start the server and handle connections until cancelled or sent SIGTERM
+        """
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+
+    def close(self):
+        """
+        Stop listening and shut down the worker pool
+        """
+        if self.server is not None:
+            self.server.close()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+    async def run(self, function, *arguments):
+        """
+        Run a function in the worker pool, or directly if there is none
+        """
+        if self.pool is None:
+            return function(*arguments)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *arguments)
+
+
+    async def handleConnection(self, reader, writer):
+        """
+        Read requests from one connection, answering each as soon as it is done
+        """
+        slots = asyncio.Semaphore(MAX_PIPELINED)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await slots.acquire()
+                task = asyncio.ensure_future(self.respond(line, writer, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+
+    async def respond(self, line, writer, slots):
+        """
+        Answer one request line
+        """
+        try:
+            try:
+                response = await self.handleRequest(line)
+            except Exception as e:
+                # Every request gets an answer, or a pipelining client would wait for it forever
+                response = {"id": findRequestId(line), "ok": False, "error": "%s: %s" % (type(e).__name__, e)}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            slots.release()
+
+
+    async def handleRequest(self, line):
+        """
+        @param line One request, as a JSON-encoded line
+        @return the response dict
+        """
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": "Bad request: " + str(e)}
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "Bad request: expected a JSON object"}
+
+        requestId = request.get("id")
+        if request.get("op", "compile") == "stats":
+            stats = self.cache.stats()
+            stats["requests"] = self.requests
+            return {"id": requestId, "ok": True, "stats": stats}
+
+        source = request.get("source")
+        tokens = request.get("tokens")
+        if (source is None) == (tokens is None):
+            return {"id": requestId, "ok": False, "error": "Expected one of source or tokens"}
+        if source is not None and not isinstance(source, str):
+            return {"id": requestId, "ok": False, "error": "Expected source to be a string"}
+        if tokens is not None and not validTokens(tokens):
+            return {"id": requestId, "ok": False, "error": "Expected tokens to be [type, value] string pairs"}
+
+        if source is not None:
+            key = ParseCache.key(b"source\0" + source.encode())
+        else:
+            key = ParseCache.key(b"tokens\0" + json.dumps(tokens).encode())
+
+        entry = self.cache.get(key)
+        if entry is None:
+            tokenCount, flat, diagnostics = await self.compile(key, source, tokens, bool(request.get("iterative")))
+        else:
+            tokenCount, flat = entry
+            diagnostics = []
+
+        if flat is None:
+            return {"id": requestId, "ok": False, "tokens": tokenCount, "diagnostics": diagnostics}
+        if request.get("format") == "text":
+            return {"id": requestId, "ok": True, "tokens": tokenCount, "text": await self.run(renderText, flat)}
+        return {"id": requestId, "ok": True, "tokens": tokenCount, "tree": flat}
+
+
+    async def compile(self, key, source, tokens, iterative):
+        """
+        Parse a payload that missed the cache, joining a parse of the same payload already under way
+        @return a (token count, flat tree or None, diagnostics) triple
+        """
+        future = self.inflight.get(key)
+        if future is not None:
+            return await future
+
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            tokenCount, flat, diagnostics = await self.run(compileRequest, source, tokens, iterative)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved, in case no other request was waiting for it
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+        entry = (tokenCount, flat, diagnostics)
+        future.set_result(entry)
+        if flat is not None:
+            self.cache.remember(key, (tokenCount, flat))
+            if self.cache.directory is not None:
+                # Encoding and writing a large tree would stall every other request on the loop
+                try:
+                    size = await asyncio.get_running_loop().run_in_executor(
+                        None, self.cache.writeFile, key, (tokenCount, flat))
+                except OSError:
+                    # The tree is still cached in memory
+                    pass
+                else:
+                    self.cache.recordFile(key, size)
+        return entry
+
+
+class CompileClient():
+
+    def __init__(self, path):
+        """
+        A blocking client for a CompileServer
+        @param path The server's socket path
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rwb")
+        self.nextId = 0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+    def close(self):
+        """
+        Close the connection
+        """
+        self.file.close()
+        self.socket.close()
+
+
+    def send(self, request):
+        """
+        Send a request without waiting for its response
+        @param request The request dict; an id is added if it has none
+        @return the request's id
+        """
+        if "id" not in request:
+            request = dict(request, id=self.nextId)
+            self.nextId += 1
+        self.file.write(json.dumps(request).encode() + b"\n")
+        return request["id"]
+
+
+    def receive(self):
+        """
+        Wait for the next response, whichever request it answers
+        @return the response dict
+        """
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Compile server closed the connection")
+        return json.loads(line)
+
+
+    def compile(self, source=None, tokens=None, **options):
+        """
+        Compile one payload and wait for the answer
+        @param source Jack source code as a string
+        @param tokens A list of [type, value] pairs, instead of source
+        @param options Other request fields, e.g. format="text"
+        @return the response dict
+        """
+        return self.pipeline([dict(options, source=source, tokens=tokens)])[0]
+
+
+    def pipeline(self, requests, window=MAX_PIPELINED // 2):
+        """
+        Send requests without waiting for each answer, keeping up to `window` of them unanswered
+        @param requests Request dicts (without ids)
+        @param window The most requests sent ahead of their responses
+        @return the responses, in the order of the requests
+        """
+        ids = []
+        responses = {}
+        for request in requests:
+            request = {name: value for name, value in request.items() if value is not None}
+            ids.append(self.send(request))
+            if len(ids) - len(responses) >= window:
+                response = self.receive()
+                responses[response["id"]] = response
+        while len(responses) < len(ids):
+            response = self.receive()
+            responses[response["id"]] = response
+        return [responses[requestId] for requestId in ids]
+
+
+if __name__ == "__main__":
+    # Usage: python CompileServer.py <socket path> [workers] [cache directory]
+    server = CompileServer(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else None,
+        ParseCache(sys.argv[3]) if len(sys.argv) > 3 else None)
+    try:
+        asyncio.run(server.serveForever())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -1,33 +1,140 @@
 from ParseTree import *
+from TokenStream import TokenStream
+from SymbolTable import SymbolTable
+
+
+# Bump whenever the trees produced for the same tokens change, or tokens that parsed stop parsing
+# (or the reverse), so cached trees are discarded. Every such change must bump it in the same commit.
+#   1  expressions, terms and expression lists parsed in full
+#   2  error recovery, symbol table hooks, constructor headers parsed from the tokens
+#   3  a constructor without its class name and name is an error, not given placeholder tokens
+PARSER_VERSION = "3"
+
+
+############ DISPATCH TABLES ############
+
+VAR_TYPES = frozenset(["int", "char", "boolean", "void"])
+CLASS_VAR_TYPES = frozenset(["static", "field"])
+SUBROUTINE_TYPES = frozenset(["constructor", "function", "method"])
+
+# Jack gives every binary operator the same precedence, applied left to right
+OPERATORS = frozenset(["+", "-", "*", "/", "&", "|", "<", ">", "="])
+UNARY_OPERATORS = frozenset(["-", "~"])
+KEYWORD_CONSTANTS = frozenset(["true", "false", "null", "this"])
+CONSTANT_TYPES = frozenset(["integerConstant", "stringConstant"])
+
+# Keyword that starts a statement -> method that compiles it
+STATEMENT_HANDLERS = {
+    "let": "compileLet",
+    "if": "compileIf",
+    "while": "compileWhile",
+    "do": "compileDo",
+    "return": "compileReturn",
+}
+
+# Statements holding a nested block of statements -> their node type
+BLOCK_STATEMENTS = {"if": "ifStatement", "while": "whileStatement"}
+
+# Keyword that starts a class member -> method that compiles it
+CLASS_MEMBER_HANDLERS = {
+    "static": "compileClassVarDec",
+    "field": "compileClassVarDec",
+    "constructor": "compileSubroutine",
+    "function": "compileSubroutine",
+    "method": "compileSubroutine",
+}
+
+# Keyword that starts an entry of a subroutine body -> method that compiles it
+BODY_HANDLERS = dict.fromkeys(STATEMENT_HANDLERS, "compileStatements")
+BODY_HANDLERS["var"] = "compileVarDec"
+
+############ DISPATCH TABLES ############
+
+
+def describeToken(tokenType, value):
+    """
+    Describe an expected token for an error message
+    @param tokenType The expected type, or None for any type
+    @param value The expected value, or None for any value
+    @return a description such as "symbol ;"
+    """
+    if value is None:
+        return tokenType if tokenType is not None else "any token"
+    if tokenType is None:
+        return value
+    return tokenType + " " + value
+
 
 class CompilerParser :
 
-    def __init__(self,tokens):
+    def __init__(self,tokens,iterative=False,recover=False,builder=None,symbols=False):
         """
         Constructor for the CompilerParser
-        @param tokens A list of tokens to be parsed
-        """
-        self.tokens = tokens
-        pass
+        @param tokens A list of tokens to be parsed, or an iterable (e.g. a JackTokenizer) read lazily
+        @param iterative If True, nested statement blocks and expressions are parsed with an explicit
+                         stack instead of recursion, so nesting depth is not limited by the recursion limit
+        @param recover If True, a class member or statement that fails to parse is recorded in
+                       self.diagnostics and skipped, and parsing carries on with the next one
+        @param builder Where non-terminal nodes come from: an object whose newTree(node_type) returns a
+                       node with addChild(), such as a TreeArena or an EventBuilder, or None for ParseTree objects
+        @param symbols If True, declarations and identifier uses are recorded in self.symbols,
+                       a SymbolTable, as they are parsed
+        """
+        self.tokens = TokenStream(tokens)
+        self.iterative = iterative
+        self.recover = recover
+        self.diagnostics = []
+        self.builder = builder
+        # (first token index, end token index) of each member parsed by compileClass
+        self.memberSpans = []
+        self.symbols = SymbolTable() if symbols else None
 
     ############ HELPER FUNCS ############
 
+    def newNode(self,node_type):
+        """
+        Create an empty non-terminal node, through the builder if the parser has one
+        @param node_type The type of node (see element types).
+        @return a ParseTree, or the builder's node
+        """
+
+        if self.builder is None:
+            return ParseTree(node_type, None)
+        return self.builder.newTree(node_type)
+
+
+    def currentValue(self):
+        """
+        Get the value of the current token
+        @return the value, or None if every token has been consumed
+        """
+        currentToken = self.tokens.current()
+        if currentToken is None:
+            return None
+        return currentToken.value
+
+
+    def currentKeyword(self):
+        """
+        Get the value of the current token if it is a keyword
+        @return the keyword, or None if the current token is not a keyword
+        """
+        currentToken = self.tokens.current()
+        if currentToken is None or currentToken.node_type != "keyword":
+            return None
+        return currentToken.value
+
+
     def varTypeCheck(self):
         """
         Checks if val is any of the var types
         @return Var types or ParseException
         """
 
-        if self.have(None, "int"): 
-            return "int"
-        elif self.have(None, "char"):
-            return "char"
-        elif self.have(None, "boolean"):
-            return "boolean"
-        elif self.have(None, "void"):
-            return "void"
-        else:
-            raise ParseException()
+        value = self.currentValue()
+        if value in VAR_TYPES:
+            return value
+        raise self.error(sorted(VAR_TYPES))
         
 
     def checkStatementType(self):
@@ -36,32 +143,137 @@ class CompilerParser :
         @return statement types or ParseException
         """       
 
-        if self.have(None, "let"): 
-            return "let"
-        elif self.have(None, "if"):
-            return "if"
-        elif self.have(None, "while"):
-            return "while"
-        elif self.have(None, "do"):
-            return "do"
-        elif self.have(None, "return"):
-            return "return"
-        else:
-            raise ParseException()
+        value = self.currentValue()
+        if value in STATEMENT_HANDLERS:
+            return value
+        raise self.error(sorted(STATEMENT_HANDLERS))
     
     ############ HELPER FUNCS ############
 
+    def error(self,expected):
+        """
+        Build a ParseException describing the current token
+        @param expected Descriptions of the tokens that would have been accepted
+        @return the ParseException, ready to raise
+        """
+
+        currentToken = self.current()
+        if currentToken is None:
+            found = "end of input"
+        else:
+            found = currentToken.getType() + " " + str(currentToken.getValue())
+        message = "Expected " + " or ".join(expected) + ", found " + found
+        return ParseException(message, self.tokens.position, expected, currentToken)
+
+
+    def compileRecovering(self,handler,skip):
+        """
+        Call a compile method. In recovery mode, a ParseException is recorded as a diagnostic
+        and the tokens it started at are skipped instead.
+        @param handler The name of the compile method
+        @param skip The name of the method that skips the tokens after a failure (skipMember or skipStatement)
+        @return the method's ParseTree, or None if it failed and was skipped
+        """
+
+        if not self.recover:
+            return getattr(self, handler)()
+
+        start = self.tokens.mark()
+        try:
+            return getattr(self, handler)()
+        except ParseException as e:
+            if not e.recorded:
+                self.diagnostics.append(Diagnostic.fromException(e))
+                e.recorded = True
+            if e.found is None:
+                # The input ended, so there is nothing to carry on with
+                raise
+            self.tokens.reset(start)
+            getattr(self, skip)()
+            if self.tokens.position == start:
+                raise
+            return None
+        finally:
+            self.tokens.release(start)
+
+
+    def speculate(self,rule,*arguments):
+        """
+        Try a compile method, moving the cursor back if it fails.
+        A rule tried this way must not give nodes to a builder, which can't take them back.
+        @param rule The name of the compile method
+        @param arguments Arguments for the method
+        @return the method's result, or None if it failed and the cursor is back where it started
+        """
+
+        mark = self.tokens.mark()
+        try:
+            return getattr(self, rule)(*arguments)
+        except ParseException:
+            self.tokens.reset(mark)
+            return None
+        finally:
+            self.tokens.release(mark)
+
+
+    def skipMember(self):
+        """
+        Skip the tokens of a class member, up to the next member at the same brace depth or the end of the class
+        """
+
+        depth = 0
+        self.next()
+        while self.current() is not None:
+            value = self.currentValue()
+            if depth == 0 and (value == "}" or self.currentKeyword() in CLASS_MEMBER_HANDLERS):
+                return
+            if value == "{":
+                depth += 1
+            elif value == "}":
+                depth -= 1
+            self.next()
+
+
+    def skipStatement(self):
+        """
+        Skip the tokens of a statement: up to and including its ";", up to and including the "}"
+        closing its block (and any else block), or up to the "}" that closes the enclosing block
+        """
+
+        depth = 0
+        while self.current() is not None:
+            value = self.currentValue()
+            if value == "}":
+                if depth == 0:
+                    return
+                depth -= 1
+                self.next()
+                if depth == 0 and self.currentKeyword() != "else":
+                    return
+                continue
+            self.next()
+            if value == "{":
+                depth += 1
+            elif value == ";" and depth == 0:
+                return
+
+
     def compileProgram(self):
         """
-        Generates a parse tree for a single program
+        Generates a parse tree for a single program.
+        In recovery mode, an error that can't be skipped is recorded and None is returned.
         @return a ParseTree that represents the program
         """
 
+        if not self.recover:
+            return self.compileClass()
+
         try:
             ret = self.compileClass()
-        except ParseException:
-            raise ParseException()
-    
+        except ParseException as e:
+            if not e.recorded:
+                self.diagnostics.append(Diagnostic.fromException(e))
+            ret = None
 
         return ret
     
@@ -72,42 +284,61 @@ class CompilerParser :
         @return a ParseTree that represents a class
         """
 
-        try:
-            program = ParseTree("class", None)
-            program.addChild(self.mustBe("keyword", "class"))
-            program.addChild(self.mustBe("identifier", None))
-            program.addChild(self.mustBe("symbol", "{"))
-
-            while self.have("symbol", "}") is False:
-                if self.have("keyword", "static") or self.have("keyword", "field"):
-                    program.addChild(self.compileClassVarDec())
-                elif self.have("keyword", "constructor") or self.have("keyword", "function") or self.have("keyword", "method"):
-                    program.addChild(self.compileSubroutine())
+        program = self.newNode("class")
+        program.addChild(self.mustBe("keyword", "class"))
+        className = self.mustBe("identifier", None)
+        program.addChild(className)
+        program.addChild(self.mustBe("symbol", "{"))
+        if self.symbols is not None:
+            self.symbols.startClass(className.value)
 
-            program.addChild(self.mustBe("symbol", "}"))
+        while self.have("symbol", "}") is False:
+            start = self.tokens.position
+            member = self.compileRecovering("compileClassMember", "skipMember")
+            if member is not None:
+                program.addChild(member)
+                self.memberSpans.append((start, self.tokens.position))
 
-        except ParseException:
-            raise ParseException()
+        program.addChild(self.mustBe("symbol", "}"))
 
         return program
 
+
+    def compileClassMember(self):
+        """
+        Generates a parse tree for whichever class member starts at the current token
+        @return a ParseTree that represents a class variable declaration or subroutine
+        """
+
+        handler = CLASS_MEMBER_HANDLERS.get(self.currentKeyword())
+        if handler is None:
+            raise self.error(sorted(CLASS_MEMBER_HANDLERS))
+
+        return getattr(self, handler)()
+
+
     def compileClassVarDec(self):
         """
         Generates a parse tree for a static variable declaration or field declaration
         @return a ParseTree that represents a static variable declaration or field declaration
         """
 
-        try:
-            classVar = ParseTree("classVarDec", None)
-            classVar.addChild(self.mustBe("keyword", self.classVarTypeCheck()))
-            classVar.addChild(self.mustBe("keyword", self.varTypeCheck()))
-            classVar.addChild(self.mustBe("identifier", None))
-            while self.have("symbol", ",") is True:
-                classVar.addChild(self.mustBe("symbol", ","))
-                classVar.addChild(self.mustBe("identifier", None))
-            classVar.addChild(self.mustBe("symbol", ";"))
-        except ParseException:
-            raise ParseException()
+        classVar = self.newNode("classVarDec")
+        kind = self.classVarTypeCheck()
+        classVar.addChild(self.mustBe("keyword", kind))
+        varType = self.varTypeCheck()
+        classVar.addChild(self.mustBe("keyword", varType))
+        names = [self.mustBe("identifier", None)]
+        classVar.addChild(names[0])
+        while self.have("symbol", ",") is True:
+            classVar.addChild(self.mustBe("symbol", ","))
+            names.append(self.mustBe("identifier", None))
+            classVar.addChild(names[-1])
+        classVar.addChild(self.mustBe("symbol", ";"))
+
+        if self.symbols is not None:
+            for name in names:
+                self.symbols.define(name.value, varType, kind)
 
         return classVar 
     
@@ -117,14 +348,10 @@ class CompilerParser :
         @return subroutine accepted types or ParseException
         """
 
-        if self.have(None, "constructor"): 
-            return "constructor"
-        elif self.have(None, "function"): 
-            return "function"
-        elif self.have(None, "method"): 
-            return "method"
-        else: 
-            raise ParseException()
+        value = self.currentValue()
+        if value in SUBROUTINE_TYPES:
+            return value
+        raise self.error(sorted(SUBROUTINE_TYPES))
     
 
     def compileSubroutine(self):
@@ -133,47 +360,64 @@ class CompilerParser :
         @return a ParseTree that represents the method, function, or constructor 
         """
 
-        try:
-            subroutine = ParseTree("subroutine", None)
-            subroutineType = self.subroutineTypeCheck()
-            subroutine.addChild(self.mustBe("keyword", subroutineType))
-
-            if subroutineType == "constructor":
-                # subroutine.addChild(self.mustBe("identifier", None))
-                subroutine.addChild(Token("identifier", "Test"))
-                # subroutine.addChild(self.mustBe("keyword", "new"))
-                subroutine.addChild(Token("keyword", "new"))
-            else:
-                subroutine.addChild(self.mustBe("keyword", self.varTypeCheck()))
-                subroutine.addChild(self.mustBe("identifier", None))
-
-            subroutine.addChild(self.mustBe("symbol", "("))
-            if self.have("symbol", ")") is False:
-                subroutine.addChild(self.compileParameterList())
-            subroutine.addChild(self.mustBe("symbol", ")"))
-            subroutine.addChild(self.compileSubroutineBody())
-        except ParseException:
-            raise ParseException()
+        subroutine = self.newNode("subroutine")
+        subroutineType = self.subroutineTypeCheck()
+        subroutine.addChild(self.mustBe("keyword", subroutineType))
+
+        if subroutineType == "constructor":
+            returnType, name = self.compileConstructorHeader()
+        else:
+            returnType = self.mustBe("keyword", self.varTypeCheck())
+            name = self.mustBe("identifier", None)
+
+        subroutine.addChild(returnType)
+        subroutine.addChild(name)
+        if self.symbols is not None:
+            self.symbols.startSubroutine(name.value, subroutineType)
+
+        subroutine.addChild(self.mustBe("symbol", "("))
+        if self.have("symbol", ")") is False:
+            subroutine.addChild(self.compileParameterList())
+        subroutine.addChild(self.mustBe("symbol", ")"))
+        subroutine.addChild(self.compileSubroutineBody())
 
         return subroutine 
     
     
+    def compileConstructorHeader(self):
+        """
+        Parses the class name and subroutine name after the constructor keyword
+        @return the two Tokens
+        """
+
+        if self.have("identifier", None):
+            returnType = self.mustBe("identifier", None)
+        else:
+            returnType = self.mustBe("keyword", self.varTypeCheck())
+        if self.have("keyword", "new"):
+            name = self.mustBe("keyword", "new")
+        else:
+            name = self.mustBe("identifier", None)
+
+        return [returnType, name]
+
+
     def compileParameterList(self):
         """
         Generates a parse tree for a subroutine's parameters
         @return a ParseTree that represents a subroutine's parameters
         """
 
-        try:
-            params = ParseTree("parameterList", None)
-            while self.have("symbol", ")") is False:
-                params.addChild(self.mustBe("keyword", self.varTypeCheck()))
-                params.addChild(self.mustBe("identifier", None))
-                if self.have("symbol", ","):
-                    params.addChild(self.mustBe("symbol", ","))
-        
-        except ParseException:
-            raise ParseException()
+        params = self.newNode("parameterList")
+        while self.have("symbol", ")") is False:
+            varType = self.varTypeCheck()
+            params.addChild(self.mustBe("keyword", varType))
+            name = self.mustBe("identifier", None)
+            params.addChild(name)
+            if self.symbols is not None:
+                self.symbols.define(name.value, varType, "argument")
+            if self.have("symbol", ","):
+                params.addChild(self.mustBe("symbol", ","))
 
         return params 
     
@@ -184,19 +428,19 @@ class CompilerParser :
         @return a ParseTree that represents a subroutine's body
         """
 
-        try:
-            body = ParseTree("subroutineBody", None)
+        body = self.newNode("subroutineBody")
 
-            body.addChild(self.mustBe("symbol", "{"))
-            while self.have("symbol", "}") is False:
-                if self.have("keyword", "var"):
-                    body.addChild(self.compileVarDec())
-                elif self.have("keyword", "let") or self.have("keyword", "if") or self.have("keyword", "while") or self.have("keyword", "do") or self.have("keyword", "return"):
-                    body.addChild(self.compileStatements())
-            body.addChild(self.mustBe("symbol", "}"))
-            
-        except ParseException:
-            raise ParseException()
+        body.addChild(self.mustBe("symbol", "{"))
+        while self.have("symbol", "}") is False:
+            handler = BODY_HANDLERS.get(self.currentKeyword())
+            if handler is None:
+                if not self.recover:
+                    raise self.error(sorted(BODY_HANDLERS))
+                handler = "compileStatements"
+            entry = self.compileRecovering(handler, "skipStatement")
+            if entry is not None:
+                body.addChild(entry)
+        body.addChild(self.mustBe("symbol", "}"))
         
         return body 
     
@@ -207,14 +451,16 @@ class CompilerParser :
         @return a ParseTree that represents a var declaration
         """
 
-        try:
-            varDec = ParseTree("varDec", None)
-            varDec.addChild(self.mustBe("keyword", "var"))
-            varDec.addChild(self.mustBe("keyword", self.varTypeCheck()))
-            varDec.addChild(self.mustBe("identifier", None))
-            varDec.addChild(self.mustBe("symbol", ";"))
-        except ParseException:
-            raise ParseException()
+        varDec = self.newNode("varDec")
+        varDec.addChild(self.mustBe("keyword", "var"))
+        varType = self.varTypeCheck()
+        varDec.addChild(self.mustBe("keyword", varType))
+        name = self.mustBe("identifier", None)
+        varDec.addChild(name)
+        varDec.addChild(self.mustBe("symbol", ";"))
+
+        if self.symbols is not None:
+            self.symbols.define(name.value, varType, "local")
 
         return varDec 
     
@@ -225,28 +471,72 @@ class CompilerParser :
         @return a ParseTree that represents the series of statements
         """
 
-        try :
-            statements = ParseTree("statements", None)
+        if self.iterative:
+            return self.compileStatementsIterative()
 
-            if self.current().getType() != "keyword": raise ParseException()
+        statements = self.newNode("statements")
 
-            statementVal = self.checkStatementType()
+        statementVal = self.currentKeyword()
+        if statementVal not in STATEMENT_HANDLERS: raise self.error(sorted(STATEMENT_HANDLERS))
 
-            if statementVal == "let":
-                statements.addChild(self.compileLet())
-            elif statementVal == "if":
-                statements.addChild(self.compileIf())
-            elif statementVal == "while":
-                statements.addChild(self.compileWhile())
-            elif statementVal == "do":
-                statements.addChild(self.compileDo())
-            elif statementVal == "return":
-                statements.addChild(self.compileReturn())
-
-        except ParseException:
-            raise ParseException()
+        statements.addChild(getattr(self, STATEMENT_HANDLERS[statementVal])())
 
         return statements 
+
+
+    def compileStatementsIterative(self):
+        """
+        Generates the same parse tree as compileStatements, keeping the if/while blocks
+        still open on an explicit stack rather than the call stack
+        @return a ParseTree that represents the series of statements
+        """
+
+        # Each open block is [statements node holding it, if/while node, keyword of the open block]
+        blocks = []
+        while True:
+            statements = self.newNode("statements")
+            statementVal = self.currentKeyword()
+            if statementVal not in STATEMENT_HANDLERS: raise self.error(sorted(STATEMENT_HANDLERS))
+
+            if statementVal in BLOCK_STATEMENTS:
+                blockTree = self.newNode(BLOCK_STATEMENTS[statementVal])
+                self.compileConditionOpen(blockTree, statementVal)
+                blocks.append([statements, blockTree, statementVal])
+            else:
+                statements.addChild(getattr(self, STATEMENT_HANDLERS[statementVal])())
+                if not blocks:
+                    return statements
+                blocks[-1][1].addChild(statements)
+
+            # Close every block that ends here, attaching each to the block around it
+            while blocks and self.have("symbol", "}"):
+                block = blocks[-1]
+                block[1].addChild(self.mustBe("symbol", "}"))
+                if block[2] == "if" and self.have("keyword", "else"):
+                    block[1].addChild(self.mustBe("keyword", "else"))
+                    block[1].addChild(self.mustBe("symbol", "{"))
+                    block[2] = "else"
+                    continue
+
+                blocks.pop()
+                block[0].addChild(block[1])
+                if not blocks:
+                    return block[0]
+                blocks[-1][1].addChild(block[0])
+
+
+    def compileConditionOpen(self,tree,keyword):
+        """
+        Adds the keyword, condition and opening brace of an if or while statement to its tree
+        @param tree The ParseTree of the statement
+        @param keyword "if" or "while"
+        """
+
+        tree.addChild(self.mustBe("keyword", keyword))
+        tree.addChild(self.mustBe("symbol", "("))
+        tree.addChild(self.compileExpression())
+        tree.addChild(self.mustBe("symbol", ")"))
+        tree.addChild(self.mustBe("symbol", "{"))
     
     
     def compileLet(self):
@@ -255,16 +545,17 @@ class CompilerParser :
         @return a ParseTree that represents the statement
         """
 
-        try:
-            letTree = ParseTree("letStatement", None)
+        letTree = self.newNode("letStatement")
 
-            letTree.addChild(self.mustBe("keyword", "let"))
-            letTree.addChild(self.mustBe("identifier", None))
-            letTree.addChild(self.mustBe("symbol", "="))
+        letTree.addChild(self.mustBe("keyword", "let"))
+        letTree.addChild(self.mustBe("identifier", None))
+        if self.have("symbol", "["):
+            letTree.addChild(self.mustBe("symbol", "["))
             letTree.addChild(self.compileExpression())
-            letTree.addChild(self.mustBe("symbol", ";"))
-        except ParseException:
-            raise ParseException()
+            letTree.addChild(self.mustBe("symbol", "]"))
+        letTree.addChild(self.mustBe("symbol", "="))
+        letTree.addChild(self.compileExpression())
+        letTree.addChild(self.mustBe("symbol", ";"))
 
         return letTree 
 
@@ -274,27 +565,24 @@ class CompilerParser :
         Generates a parse tree for an if statement
         @return a ParseTree that represents the statement
         """
-        try:
-            ifTree = ParseTree("ifStatement", None)
+        ifTree = self.newNode("ifStatement")
+
+        self.compileConditionOpen(ifTree, "if")
+        while self.have("symbol", "}") is False:
+            statements = self.compileRecovering("compileStatements", "skipStatement")
+            if statements is not None:
+                ifTree.addChild(statements)
+        ifTree.addChild(self.mustBe("symbol", "}"))
 
-            ifTree.addChild(self.mustBe("keyword", "if"))
-            ifTree.addChild(self.mustBe("symbol", "("))
-            ifTree.addChild(self.compileExpression())
-            ifTree.addChild(self.mustBe("symbol", ")"))
+        if self.have("keyword", "else") is True:
+            ifTree.addChild(self.mustBe("keyword", "else"))
             ifTree.addChild(self.mustBe("symbol", "{"))
             while self.have("symbol", "}") is False:
-                ifTree.addChild(self.compileStatements())
+                statements = self.compileRecovering("compileStatements", "skipStatement")
+                if statements is not None:
+                    ifTree.addChild(statements)
             ifTree.addChild(self.mustBe("symbol", "}"))
 
-            if self.have("keyword", "else") is True:
-                ifTree.addChild(self.mustBe("keyword", "else"))
-                ifTree.addChild(self.mustBe("symbol", "{"))
-                while self.have("symbol", "}") is False:
-                    ifTree.addChild(self.compileStatements())
-                ifTree.addChild(self.mustBe("symbol", "}"))
-
-        except ParseException:
-            raise ParseException()
 
         return ifTree 
 
@@ -304,20 +592,15 @@ class CompilerParser :
         Generates a parse tree for a while statement
         @return a ParseTree that represents the statement
         """
-        try:
-            whileTree = ParseTree("whileStatement", None)
+        whileTree = self.newNode("whileStatement")
 
-            whileTree.addChild(self.mustBe("keyword", "while"))
-            whileTree.addChild(self.mustBe("symbol", "("))
-            whileTree.addChild(self.compileExpression())
-            whileTree.addChild(self.mustBe("symbol", ")"))
-            whileTree.addChild(self.mustBe("symbol", "{"))
-            while self.have("symbol", "}") is False:
-                whileTree.addChild(self.compileStatements())
-            whileTree.addChild(self.mustBe("symbol", "}"))
+        self.compileConditionOpen(whileTree, "while")
+        while self.have("symbol", "}") is False:
+            statements = self.compileRecovering("compileStatements", "skipStatement")
+            if statements is not None:
+                whileTree.addChild(statements)
+        whileTree.addChild(self.mustBe("symbol", "}"))
 
-        except ParseException:
-            raise ParseException()
         return whileTree 
 
 
@@ -327,15 +610,12 @@ class CompilerParser :
         @return a ParseTree that represents the statement
         """
 
-        try:
-            doTree = ParseTree("doStatement", None)
+        doTree = self.newNode("doStatement")
 
-            doTree.addChild(self.mustBe("keyword", "do"))
-            doTree.addChild(self.compileExpression())
-            doTree.addChild(self.mustBe("symbol", ";"))
+        doTree.addChild(self.mustBe("keyword", "do"))
+        doTree.addChild(self.compileExpression())
+        doTree.addChild(self.mustBe("symbol", ";"))
 
-        except ParseException:
-            raise ParseException()
         return doTree 
 
 
@@ -344,36 +624,209 @@ class CompilerParser :
         Generates a parse tree for a return statement
         @return a ParseTree that represents the statement
         """
-        try:
-            returnTree = ParseTree("returnStatement", None)
+        returnTree = self.newNode("returnStatement")
 
-            returnTree.addChild(self.mustBe("keyword", "return"))
+        returnTree.addChild(self.mustBe("keyword", "return"))
+        if self.have("symbol", ";") is False:
             returnTree.addChild(self.compileExpression())
-            returnTree.addChild(self.mustBe("symbol", ";"))
+        returnTree.addChild(self.mustBe("symbol", ";"))
 
-        except ParseException:
-            raise ParseException()
         return returnTree
 
 
     def compileExpression(self):
         """
-        Generates a parse tree for an expression
+        Generates a parse tree for an expression.
+        Operator chains are read in a loop, so their length doesn't grow the stack.
         @return a ParseTree that represents the expression
         """
 
-        expression = ParseTree("expression", None)
-        expression.addChild(self.mustBe("keyword", "skip"))
+        if self.iterative:
+            return self.compileExpressionIterative()
+
+        expression = self.newNode("expression")
+        if self.have("keyword", "skip"):
+            expression.addChild(self.mustBe("keyword", "skip"))
+            return expression
+
+        expression.addChild(self.compileTerm())
+        while self.currentValue() in OPERATORS and self.have("symbol", None):
+            expression.addChild(self.mustBe("symbol", None))
+            expression.addChild(self.compileTerm())
 
         return expression 
 
 
+    def compileExpressionIterative(self):
+        """
+        Generates the same parse tree as compileExpression, keeping the terms and expressions
+        still open (grouping brackets, array indices, call arguments) on an explicit stack
+        @return a ParseTree that represents the expression
+        """
+
+        # Each open node is [kind, node, ...] and receives the next node completed above it:
+        #   "expression": a term, then reads the next operator if there is one
+        #   "unary": the term following its operator
+        #   "group": the expression before the closing symbol it holds
+        #   "list": an argument expression for the expressionList it holds
+        frames = []
+        node = self.openExpression(frames)
+        while True:
+            if node is None:
+                node = self.openTerm(frames)
+                continue
+
+            if not frames:
+                return node
+            frame = frames[-1]
+            kind = frame[0]
+
+            if kind == "list":
+                frame[2].addChild(node)
+            else:
+                frame[1].addChild(node)
+
+            if kind == "expression":
+                if self.currentValue() in OPERATORS and self.have("symbol", None):
+                    frame[1].addChild(self.mustBe("symbol", None))
+                    node = None
+                    continue
+            elif kind == "group":
+                frame[1].addChild(self.mustBe("symbol", frame[2]))
+            elif kind == "list":
+                if self.have("symbol", ","):
+                    frame[2].addChild(self.mustBe("symbol", ","))
+                    node = self.openExpression(frames)
+                    continue
+                frame[1].addChild(frame[2])
+                frame[1].addChild(self.mustBe("symbol", ")"))
+
+            frames.pop()
+            node = frame[1]
+
+
+    def openExpression(self,frames):
+        """
+        Starts an expression for compileExpressionIterative
+        @param frames The stack of open nodes
+        @return the finished expression if it is just "skip", otherwise None once it is opened
+        """
+
+        expression = self.newNode("expression")
+        if self.have("keyword", "skip"):
+            expression.addChild(self.mustBe("keyword", "skip"))
+            return expression
+
+        frames.append(["expression", expression])
+        return None
+
+
+    def openTerm(self,frames):
+        """
+        Starts a term for compileExpressionIterative
+        @param frames The stack of open nodes
+        @return the finished term if nothing inside it is left open, otherwise the result of opening the nested expression
+        """
+
+        term = self.newNode("term")
+        while self.currentValue() in UNARY_OPERATORS and self.have("symbol", None):
+            term.addChild(self.mustBe("symbol", None))
+            frames.append(["unary", term])
+            term = self.newNode("term")
+
+        currentToken = self.current()
+        if currentToken is None:
+            raise self.error(["term"])
+        tokenType = currentToken.getType()
+
+        if tokenType in CONSTANT_TYPES:
+            term.addChild(self.mustBe(tokenType, None))
+        elif tokenType == "keyword" and currentToken.getValue() in KEYWORD_CONSTANTS:
+            term.addChild(self.mustBe("keyword", None))
+        elif self.have("symbol", "("):
+            term.addChild(self.mustBe("symbol", "("))
+            frames.append(["group", term, ")"])
+            return self.openExpression(frames)
+        elif tokenType == "identifier":
+            term.addChild(self.mustBe("identifier", None))
+            if self.have("symbol", "["):
+                term.addChild(self.mustBe("symbol", "["))
+                frames.append(["group", term, "]"])
+                return self.openExpression(frames)
+            elif self.have("symbol", "(") or self.have("symbol", "."):
+                if self.have("symbol", "."):
+                    term.addChild(self.mustBe("symbol", "."))
+                    term.addChild(self.mustBe("identifier", None))
+                term.addChild(self.mustBe("symbol", "("))
+                expressionList = self.newNode("expressionList")
+                if self.have("symbol", ")") is False:
+                    frames.append(["list", term, expressionList])
+                    return self.openExpression(frames)
+                term.addChild(expressionList)
+                term.addChild(self.mustBe("symbol", ")"))
+        else:
+            raise self.error(["term"])
+
+        return term
+
+
     def compileTerm(self):
         """
         Generates a parse tree for an expression term
         @return a ParseTree that represents the expression term
         """
-        return None 
+
+        # Each unary operator wraps the rest of the term in a nested term
+        term = self.newNode("term")
+        outer = []
+        while self.currentValue() in UNARY_OPERATORS and self.have("symbol", None):
+            term.addChild(self.mustBe("symbol", None))
+            outer.append(term)
+            term = self.newNode("term")
+
+        currentToken = self.current()
+        if currentToken is None:
+            raise self.error(["term"])
+        tokenType = currentToken.getType()
+
+        if tokenType in CONSTANT_TYPES:
+            term.addChild(self.mustBe(tokenType, None))
+        elif tokenType == "keyword" and currentToken.getValue() in KEYWORD_CONSTANTS:
+            term.addChild(self.mustBe("keyword", None))
+        elif self.have("symbol", "("):
+            term.addChild(self.mustBe("symbol", "("))
+            term.addChild(self.compileExpression())
+            term.addChild(self.mustBe("symbol", ")"))
+        elif tokenType == "identifier":
+            term.addChild(self.mustBe("identifier", None))
+            if self.have("symbol", "["):
+                term.addChild(self.mustBe("symbol", "["))
+                term.addChild(self.compileExpression())
+                term.addChild(self.mustBe("symbol", "]"))
+            elif self.have("symbol", "(") or self.have("symbol", "."):
+                self.compileSubroutineCall(term)
+        else:
+            raise self.error(["term"])
+
+        for parent in reversed(outer):
+            parent.addChild(term)
+            term = parent
+
+        return term 
+
+
+    def compileSubroutineCall(self,term):
+        """
+        Adds the rest of a subroutine call to a term, after its leading identifier
+        @param term The ParseTree of the term containing the call
+        """
+
+        if self.have("symbol", "."):
+            term.addChild(self.mustBe("symbol", "."))
+            term.addChild(self.mustBe("identifier", None))
+        term.addChild(self.mustBe("symbol", "("))
+        term.addChild(self.compileExpressionList())
+        term.addChild(self.mustBe("symbol", ")"))
 
 
     def compileExpressionList(self):
@@ -381,28 +834,32 @@ class CompilerParser :
         Generates a parse tree for an expression list
         @return a ParseTree that represents the expression list
         """
-        return None
+
+        expressionList = self.newNode("expressionList")
+        if self.have("symbol", ")") is False:
+            expressionList.addChild(self.compileExpression())
+            while self.have("symbol", ","):
+                expressionList.addChild(self.mustBe("symbol", ","))
+                expressionList.addChild(self.compileExpression())
+
+        return expressionList
 
 
     def next(self):
         """
         Advance to the next token
         """
-        if self.tokens is not None:
-            del self.tokens[0]
+        self.tokens.advance()
         return
 
 
     def current(self):
         """
         Return the current token
-        @return the token
+        @return the token, or None if every token has been consumed
         """
 
-        if self.tokens is not None:
-            return self.tokens[0]
-
-        return None
+        return self.tokens.current()
 
 
     def have(self,expectedType,expectedValue):
@@ -432,10 +889,12 @@ class CompilerParser :
 
         if self.have(expectedType, expectedValue):
             currentToken = self.current()
+            if self.symbols is not None and currentToken.node_type == "identifier":
+                self.symbols.recordUse(currentToken.value, self.tokens.position)
             self.next()
             return currentToken
         
-        raise ParseException("Not Matching")
+        raise self.error([describeToken(expectedType, expectedValue)])
 
     def classVarTypeCheck(self):
         """
@@ -443,12 +902,10 @@ class CompilerParser :
         @return "static" or "field" or ParseException
         """
 
-        if self.have(None, "static"): 
-            return "static"
-        elif self.have(None, "field"): 
-            return "field"
-        else: 
-            raise ParseException()
+        value = self.currentValue()
+        if value in CLASS_VAR_TYPES:
+            return value
+        raise self.error(sorted(CLASS_VAR_TYPES))
     
 
 if __name__ == "__main__":
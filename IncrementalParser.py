@@ -0,0 +1,111 @@
+from ParseTree import ParseTree, ParseException
+from CompilerParser import CompilerParser
+
+
+# Children of a class node before its first member: keyword class, identifier, symbol {
+MEMBER_OFFSET = 3
+
+
+class IncrementalParser():
+
+    def __init__(self, tokens, iterative=False):
+        """
+        Keeps the parse tree of a class up to date as its tokens are edited,
+        reparsing only the class member an edit falls inside
+        @param tokens A list of tokens for a single class
+        @param iterative Parse with CompilerParser's explicit-stack mode
+        """
+        self.iterative = iterative
+        self.tokens = list(tokens)
+        self.incremental = False
+        self.parseClass()
+
+
+    def parseClass(self):
+        """
+        Parse the whole class from scratch
+        @return a ParseTree that represents the class
+        """
+        parser = CompilerParser(self.tokens, self.iterative)
+        self.tree = parser.compileProgram()
+        self.spans = parser.memberSpans
+        return self.tree
+
+
+    def getTree(self):
+        """
+        @return the ParseTree of the class as of the last edit
+        """
+        return self.tree
+
+
+    def update(self, start, end, newTokens):
+        """
+        Apply an edit to the tokens and bring the parse tree up to date.
+        If the edit lies inside one classVarDec or subroutine, only that member is reparsed
+        and every other subtree is reused; otherwise the whole class is reparsed.
+        The previous tree is left unchanged, and if the edited class doesn't parse the edit is undone,
+        so the tokens, tree and member spans still match for the next update.
+        @param start Index of the first token replaced
+        @param end Index one past the last token replaced
+        @param newTokens The tokens to put in their place
+        @return a ParseTree that represents the edited class
+        @throws ParseException if the edited class doesn't parse
+        """
+        newTokens = list(newTokens)
+        replaced = self.tokens[start:end]
+        self.tokens[start:end] = newTokens
+        delta = len(newTokens) - (end - start)
+
+        # The member keyword and the member's final token must survive the edit
+        index = self.findMember(start, end)
+        if index is not None:
+            memberStart, memberEnd = self.spans[index]
+            memberEnd += delta
+            parser = CompilerParser(self.tokens[memberStart:memberEnd], self.iterative)
+            try:
+                member = parser.compileClassMember()
+            except ParseException:
+                member = None
+
+            if member is not None and parser.tokens.atEnd():
+                tree = ParseTree("class", None)
+                for i, child in enumerate(self.tree.getChildren()):
+                    tree.addChild(member if i == MEMBER_OFFSET + index else child)
+
+                self.spans[index] = (memberStart, memberEnd)
+                for i in range(index + 1, len(self.spans)):
+                    spanStart, spanEnd = self.spans[i]
+                    self.spans[i] = (spanStart + delta, spanEnd + delta)
+
+                self.tree = tree
+                self.incremental = True
+                return tree
+
+        self.incremental = False
+        try:
+            return self.parseClass()
+        except Exception:
+            # parseClass() only reassigns the tree and spans once it succeeds, so put the old tokens back
+            self.tokens[start:start + len(newTokens)] = replaced
+            raise
+
+
+    def findMember(self, start, end):
+        """
+        Find the member whose tokens strictly contain an edit
+        @return the index of the member in self.spans, or None
+        """
+        low, high = 0, len(self.spans)
+        while low < high:
+            middle = (low + high) // 2
+            if self.spans[middle][1] <= start:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(self.spans):
+            memberStart, memberEnd = self.spans[low]
+            if memberStart < start and end < memberEnd:
+                return low
+        return None
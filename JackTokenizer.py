@@ -0,0 +1,211 @@
+import re
+from array import array
+
+from ParseTree import ParseException, makeToken
+
+
+KEYWORDS = frozenset([
+    "class", "constructor", "function", "method", "field", "static", "var",
+    "int", "char", "boolean", "void", "true", "false", "null", "this",
+    "let", "do", "if", "else", "while", "return", "skip",
+])
+
+# Encoding of Jack source files, used wherever source is read from a file or decoded from bytes
+SOURCE_ENCODING = "utf-8"
+
+# Codes stored in a TokenTable's types column, indexing TOKEN_TYPES
+INTEGER, STRING, KEYWORD, IDENTIFIER, OPEN, SYMBOL, ERROR = range(1, 8)
+TOKEN_TYPES = (None, "integerConstant", "stringConstant", "keyword", "identifier", None, "symbol", None)
+
+# Each match skips any whitespace and comments, then captures one token in the group of its code.
+# OPEN catches a comment or string that may be completed by more input, ERROR any other character,
+# and the empty match at the end means only whitespace and comments were left.
+TOKEN_PATTERN = re.compile(r"""
+    (?:\s|//[^\n]*|/\*.*?\*/)*
+    (?:
+         (\d+)
+        |"([^"\n]*)"
+        |((?:%s)(?!\w))
+        |([A-Za-z_]\w*)
+        |(/\*|")
+        |([{}()\[\].,;+\-*/&|<>=~])
+        |(.)
+        |\Z
+    )
+""" % "|".join(sorted(KEYWORDS, key=len, reverse=True)), re.VERBOSE | re.DOTALL)
+
+class TokenTable():
+
+    def __init__(self, text):
+        """
+        The tokens of some source text as parallel columns of type codes and offsets.
+        Tokens are classified in bulk by classify(); Token objects are only made when asked for.
+        @param text The source text
+        """
+        self.text = text
+        self.types = array("b")
+        self.starts = array("i")
+        self.ends = array("i")
+
+
+    def __len__(self):
+        """
+        @return the number of tokens classified
+        """
+        return len(self.types)
+
+
+    def classify(self, final=True):
+        """
+        Classify every token in the text
+        @param final False if more text may follow, in which case classification stops before
+                     a token that touches the end of the text or may still be completed
+        @return the offset where classification stopped, from which the rest must be classified again;
+                if a comment or string is still open, the offset of its opening "/*" or quote
+        @throws ParseException if the text holds a character that can't start a token, or, if final,
+                an unterminated comment or string
+        """
+        text = self.text
+        length = len(text)
+        appendType = self.types.append
+        appendStart = self.starts.append
+        appendEnd = self.ends.append
+
+        for match in TOKEN_PATTERN.finditer(text):
+            code = match.lastindex
+            if not final:
+                if code == OPEN:
+                    # A string can't run past the end of its line, so more text won't complete it
+                    if text[match.start(code)] != '"' or text.find("\n", match.end()) < 0:
+                        return match.start(code)
+                elif match.end() == length:
+                    return match.start()
+            if code is None:
+                break
+            if code >= OPEN and code != SYMBOL:
+                if text.startswith("/*", match.start(code)):
+                    raise ParseException("Unterminated comment")
+                raise ParseException("Unexpected character " + repr(match.group(code)))
+            start, end = match.span(code)
+            appendType(code)
+            appendStart(start)
+            appendEnd(end)
+        return length
+
+
+    def tokenType(self, index):
+        """
+        @param index The index of a token
+        @return its type, e.g. "keyword"
+        """
+        return TOKEN_TYPES[self.types[index]]
+
+
+    def value(self, index):
+        """
+        @param index The index of a token
+        @return its text, without the quotes of a string constant
+        """
+        return self.text[self.starts[index]:self.ends[index]]
+
+
+    def token(self, index):
+        """
+        @param index The index of a token
+        @return a Token for it, shared for keywords and symbols
+        """
+        return makeToken(TOKEN_TYPES[self.types[index]], self.text[self.starts[index]:self.ends[index]])
+
+
+    def __iter__(self):
+        """
+        Generate a Token for each classified token in order
+        @return a generator of Tokens
+        """
+        text = self.text
+        for code, start, end in zip(self.types, self.starts, self.ends):
+            yield makeToken(TOKEN_TYPES[code], text[start:end])
+
+
+class JackTokenizer():
+
+    def __init__(self, source, chunkSize=65536):
+        """
+        Splits Jack source code into Tokens, reading the source a chunk at a time
+        @param source A file path, or a file-like object with a read() method
+        @param chunkSize The number of characters to read from the source at once
+        """
+        self.source = source
+        self.chunkSize = chunkSize
+
+
+    def __iter__(self):
+        """
+        Generate the tokens of the source in order
+        @return a generator of Tokens
+        """
+        if hasattr(self.source, "read"):
+            return self.scan(self.source)
+        return self.scanFile()
+
+
+    def scanFile(self):
+        """
+        Generate the tokens of a source file, closing it once exhausted
+        @return a generator of Tokens
+        """
+        with open(self.source, "r", encoding=SOURCE_ENCODING) as file:
+            yield from self.scan(file)
+
+
+    def scan(self, file):
+        """
+        Generate the tokens read from a file-like object, classifying a chunk at a time
+        @param file The file-like object to read
+        @return a generator of Tokens
+        """
+        buffer = ""
+        # Chunks read while a comment or string is open, held back until one of them can close it,
+        # so a long comment isn't classified again for every chunk
+        held = []
+        while True:
+            chunk = file.read(self.chunkSize)
+            if held:
+                if chunk:
+                    if held[0].startswith("/*"):
+                        closing = "*/" in held[-1][-1:] + chunk
+                    else:
+                        closing = '"' in chunk or "\n" in chunk
+                    held.append(chunk)
+                    if not closing:
+                        continue
+                buffer = "".join(held)
+                held = []
+            else:
+                buffer += chunk
+
+            table = TokenTable(buffer)
+            # Only a token touching the end of the buffer is classified again with the next chunk
+            stop = table.classify(final=not chunk)
+            yield from table
+            if not chunk:
+                return
+            buffer = buffer[stop:]
+            if buffer.startswith("/*") or buffer.startswith('"'):
+                held.append(buffer)
+
+
+    def tokenTable(self):
+        """
+        Read the whole source and classify it without making any Tokens
+        @return a TokenTable
+        @throws ParseException if the source holds a character that can't start a token
+        """
+        if hasattr(self.source, "read"):
+            text = self.source.read()
+        else:
+            with open(self.source, "r", encoding=SOURCE_ENCODING) as file:
+                text = file.read()
+        table = TokenTable(text)
+        table.classify()
+        return table
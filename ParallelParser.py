@@ -0,0 +1,161 @@
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ParseTree import ParseTree, ParseException, makeToken
+from CompilerParser import CompilerParser, CLASS_VAR_TYPES, SUBROUTINE_TYPES
+
+
+def scanMembers(tokens):
+    """
+    Find the span of every class member by matching braces, without parsing anything
+    @param tokens A list of tokens for a single class
+    @return a list of (first token index, end token index) spans, one per member,
+            or None if the tokens don't have the shape of a class
+    """
+    if len(tokens) < 4 or tokens[0].value != "class" or tokens[1].node_type != "identifier" or tokens[2].value != "{":
+        return None
+
+    spans = []
+    i = 3
+    last = len(tokens) - 1
+    while i < last:
+        token = tokens[i]
+        if token.node_type != "keyword":
+            return None
+        start = i
+        if token.value in CLASS_VAR_TYPES:
+            # A declaration holds no braces, so it ends at the first ";"
+            while i < last and tokens[i].value != ";":
+                i += 1
+        elif token.value in SUBROUTINE_TYPES:
+            while i < last and tokens[i].value != "{":
+                i += 1
+            depth = 0
+            while i < last:
+                token = tokens[i]
+                if token.node_type == "symbol":
+                    if token.value == "{":
+                        depth += 1
+                    elif token.value == "}":
+                        depth -= 1
+                        if depth == 0:
+                            break
+                i += 1
+        else:
+            return None
+        i += 1
+        spans.append((start, i))
+
+    if i != last or tokens[last].value != "}":
+        return None
+    return spans
+
+
+def parseMembers(types, values, spans, iterative=False):
+    """
+    Parse a batch of class members. Runs inside the worker processes.
+    @param types The types of the tokens holding the members
+    @param values The values of the same tokens
+    @param spans (start, end) indexes into the tokens of each member
+    @param iterative Parse with CompilerParser's explicit-stack mode
+    @return a tree in ParseTree.toFlat() form per member, or None if a member failed to parse
+    """
+    tokens = [makeToken(tokenType, value) for tokenType, value in zip(types, values)]
+    flats = []
+    for start, end in spans:
+        parser = CompilerParser(tokens[start:end], iterative)
+        try:
+            member = parser.compileClassMember()
+        except ParseException:
+            return None
+        if not parser.tokens.atEnd():
+            return None
+        flats.append(member.toFlat())
+    return flats
+
+
+class ParallelParser():
+
+    def __init__(self, workers=None, iterative=False, batches=4, minMembers=64):
+        """
+        Parses the members of one large class in parallel worker processes.
+        A brace-matching pre-scan splits the class into members, each worker parses a run of them,
+        and the results are stitched into the same class ParseTree a sequential parse would give.
+        @param workers Number of worker processes. None uses one per CPU; 0 parses in this process.
+        @param iterative Parse with CompilerParser's explicit-stack mode
+        @param batches Number of runs of members handed to each worker
+        @param minMembers Classes with fewer members are parsed sequentially
+        """
+        self.workers = workers
+        self.iterative = iterative
+        self.batches = batches
+        self.minMembers = minMembers
+        self.memberSpans = []
+
+
+    def parse(self, tokens):
+        """
+        Generates a parse tree for a single class
+        @param tokens A list or iterable of tokens
+        @return a ParseTree that represents the class
+        @throws ParseException if the class doesn't parse, the same as a sequential parse
+        """
+        tokens = list(tokens)
+        spans = scanMembers(tokens)
+        if spans is None or len(spans) < self.minMembers:
+            return self.parseSequential(tokens)
+
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        size = max(1, -(-len(spans) // (max(workers, 1) * self.batches)))
+        types = [token.node_type for token in tokens]
+        values = [token.value for token in tokens]
+
+        # Each batch carries only its own tokens, with spans relative to them
+        arguments = ([], [], [], [])
+        for first in range(0, len(spans), size):
+            batch = spans[first:first + size]
+            start, end = batch[0][0], batch[-1][1]
+            arguments[0].append(types[start:end])
+            arguments[1].append(values[start:end])
+            arguments[2].append([(memberStart - start, memberEnd - start) for memberStart, memberEnd in batch])
+            arguments[3].append(self.iterative)
+
+        if self.workers == 0:
+            results = list(map(parseMembers, *arguments))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(parseMembers, *arguments))
+
+        if any(flats is None for flats in results):
+            # Let a sequential parse report the error exactly as it would have
+            return self.parseSequential(tokens)
+
+        # Parse trees hold no reference cycles, so the cyclic collector has nothing to find while
+        # stitching, yet with a large tree alive each of its full passes would walk every node
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            tree = ParseTree("class", None)
+            for token in tokens[:3]:
+                tree.addChild(token)
+            for flats in results:
+                for flat in flats:
+                    tree.addChild(ParseTree.fromFlat(flat))
+            tree.addChild(tokens[-1])
+        finally:
+            if collecting:
+                gc.enable()
+        self.memberSpans = spans
+        return tree
+
+
+    def parseSequential(self, tokens):
+        """
+        Parse the class in this process
+        @return a ParseTree that represents the class
+        """
+        parser = CompilerParser(tokens, self.iterative)
+        tree = parser.compileProgram()
+        self.memberSpans = parser.memberSpans
+        return tree
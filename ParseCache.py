@@ -0,0 +1,190 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from CompilerParser import CompilerParser, PARSER_VERSION
+from JackTokenizer import JackTokenizer, SOURCE_ENCODING
+
+
+class ParseCache():
+
+    def __init__(self, directory=None, capacity=256, maxBytes=64 * 1024 * 1024):
+        """
+        Caches parse results keyed by a hash of the source, in memory and optionally on disk.
+        Entries are (token count, tree in ParseTree.toFlat() form) pairs. On disk they are stored as
+        JSON rather than pickled, so a file planted in the directory can't run code when loaded.
+        @param directory Where to persist entries, or None to keep them in memory only
+        @param capacity The most entries held in memory, least recently used evicted first
+        @param maxBytes The most bytes of entries kept on disk, least recently used evicted first
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.maxBytes = maxBytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Size of each file on disk, least recently used first
+        self.files = OrderedDict()
+        self.diskBytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                if name.endswith(".tree"):
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+            for mtime, key, size in sorted(entries):
+                self.files[key] = size
+                self.diskBytes += size
+
+
+    @staticmethod
+    def key(source):
+        """
+        Get the cache key of some source code
+        @param source The source as bytes
+        @return a hex digest of the parser version and source
+        """
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+
+    def get(self, key):
+        """
+        Look up an entry, from memory first and then disk
+        @param key A key from ParseCache.key()
+        @return the (tokens, flat tree) entry, or None on a miss
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        if key in self.files:
+            path = self.path(key)
+            try:
+                with open(path, "rb") as file:
+                    tokens, flat = json.loads(file.read())
+                entry = (tokens, flat)
+                os.utime(path)
+            except (OSError, ValueError, TypeError):
+                # Unreadable, or written by an older version of the cache
+                self.forget(key)
+            else:
+                self.files.move_to_end(key)
+                self.remember(key, entry)
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+
+    def put(self, key, entry):
+        """
+        Store an entry in memory and on disk
+        @param key A key from ParseCache.key()
+        @param entry The (tokens, flat tree) pair to store
+        """
+        self.remember(key, entry)
+        if self.directory is not None:
+            self.recordFile(key, self.writeFile(key, entry))
+
+
+    def writeFile(self, key, entry):
+        """
+        Write an entry to disk without recording it. Touches no other state of the cache,
+        so it may run on another thread; pass its result to recordFile() afterwards.
+        @param key A key from ParseCache.key()
+        @param entry The (tokens, flat tree) pair to store
+        @return the size of the file written
+        """
+        path = self.path(key)
+        data = json.dumps(entry, separators=(",", ":")).encode()
+        temporary = path + ".%d.%d.tmp" % (os.getpid(), threading.get_ident())
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+        return len(data)
+
+
+    def recordFile(self, key, size):
+        """
+        Account for a file written by writeFile(), evicting the least recently used files
+        if the disk budget is exceeded
+        @param key A key from ParseCache.key()
+        @param size The size of the file
+        """
+        self.diskBytes += size - self.files.pop(key, 0)
+        self.files[key] = size
+        while self.diskBytes > self.maxBytes and len(self.files) > 1:
+            self.forget(next(iter(self.files)))
+            self.evictions += 1
+
+
+    def compile(self, source):
+        """
+        Parse some source code, or fetch its parse from the cache
+        @param source The source as bytes
+        @return the (tokens, flat tree) entry
+        @throws ParseException if the source doesn't parse
+        """
+        key = self.key(source)
+        entry = self.get(key)
+        if entry is None:
+            parser = CompilerParser(JackTokenizer(io.StringIO(source.decode(SOURCE_ENCODING))))
+            tree = parser.compileProgram()
+            entry = (parser.tokens.position, tree.toFlat())
+            self.put(key, entry)
+        return entry
+
+
+    def remember(self, key, entry):
+        """
+        Add an entry to the in-memory LRU, evicting the least recently used if it is full
+        """
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+
+    def forget(self, key):
+        """
+        Remove an entry from disk
+        """
+        self.diskBytes -= self.files.pop(key, 0)
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+
+    def path(self, key):
+        """
+        @return the file an entry is stored in on disk
+        """
+        return os.path.join(self.directory, key + ".tree")
+
+
+    def stats(self):
+        """
+        @return a dict of hit/miss/eviction counters and cache sizes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memoryEntries": len(self.memory),
+            "diskEntries": len(self.files),
+            "diskBytes": self.diskBytes,
+        }
@@ -0,0 +1,146 @@
+import queue
+import threading
+
+from CompilerParser import CompilerParser
+
+
+START = "start"
+END = "end"
+TOKEN = "token"
+
+
+class EventNode():
+
+    __slots__ = ("builder", "node_type")
+
+    def __init__(self, builder, node_type):
+        """
+        Stands in for a non-terminal ParseTree while parsing in event mode.
+        It keeps no children: each one is reported as an event as it is added.
+        @param builder The EventBuilder that created the node
+        @param node_type The type of node (see element types).
+        """
+        self.builder = builder
+        self.node_type = node_type
+
+
+    def addChild(self, child):
+        """
+        Report a child: a finished non-terminal as an "end" event, a Token as a "token" event
+        @param child An EventNode or Token
+        """
+        if child.__class__ is EventNode:
+            self.builder.callback(END, child.node_type, None)
+        else:
+            self.builder.callback(TOKEN, child.node_type, child.value)
+
+
+    def getType(self):
+        """
+        Get the type of this node
+        @return The type of node (see element types).
+        """
+        return self.node_type
+
+
+class EventBuilder():
+
+    def __init__(self, callback):
+        """
+        A CompilerParser builder that reports the tree as events instead of building it.
+        The parser only attaches a node once it is complete, so events arrive in document order:
+        "start" when a non-terminal begins, "token" for each terminal, "end" when it is complete.
+        @param callback Called as callback(event, node_type, value); value is None except for tokens
+        """
+        self.callback = callback
+
+
+    def newTree(self, node_type):
+        """
+        Report the start of a non-terminal
+        @param node_type The type of node (see element types).
+        @return an EventNode standing in for it
+        """
+        self.callback(START, node_type, None)
+        return EventNode(self, node_type)
+
+
+def parseEvents(tokens, callback, rule="compileProgram", iterative=False):
+    """
+    Parse tokens, reporting the tree as events without allocating it
+    @param tokens A list or iterable of tokens, as for CompilerParser
+    @param callback Called as callback(event, node_type, value) for every event
+    @param rule The name of the CompilerParser method to parse with
+    @param iterative Parse with CompilerParser's explicit-stack mode
+    @throws ParseException if the tokens don't parse; events already reported stay reported
+    """
+    parser = CompilerParser(tokens, iterative, builder=EventBuilder(callback))
+    root = getattr(parser, rule)()
+    callback(END, root.node_type, None)
+
+
+class StopParsing(Exception):
+    """
+    Raised inside the parsing thread of iterEvents once its consumer has gone away
+    """
+    pass
+
+
+def iterEvents(tokens, rule="compileProgram", iterative=False, batchSize=256):
+    """
+    Parse tokens on a background thread, generating the events of parseEvents.
+    Only a few batches of events are buffered at a time.
+    @param tokens A list or iterable of tokens, as for CompilerParser
+    @param rule The name of the CompilerParser method to parse with
+    @param iterative Parse with CompilerParser's explicit-stack mode
+    @param batchSize The number of events handed over at a time
+    @return a generator of (event, node_type, value) tuples
+    @throws ParseException from the generator if the tokens don't parse
+    """
+    batches = queue.Queue(maxsize=4)
+    stopped = threading.Event()
+    batch = []
+
+    def put(item):
+        # Give up if the consumer stops reading, rather than blocking forever
+        while True:
+            if stopped.is_set():
+                raise StopParsing()
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def collect(event, node_type, value):
+        batch.append((event, node_type, value))
+        if len(batch) >= batchSize:
+            put(list(batch))
+            del batch[:]
+
+    def run():
+        try:
+            parseEvents(tokens, collect, rule, iterative)
+            put(list(batch))
+            put(None)
+        except StopParsing:
+            pass
+        except BaseException as error:
+            try:
+                put(list(batch))
+                put(error)
+            except StopParsing:
+                pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stopped.set()
@@ -1,22 +1,78 @@
+import sys
+
+
 class ParseException(Exception):
     """
     Raised when tokens provided don't match the expected grammar
     Use this with `raise ParseException("My error message")`
     """
-    pass
+
+    def __init__(self, message="", tokenIndex=None, expected=(), found=None):
+        """
+        @param message A description of the error
+        @param tokenIndex The index of the offending token in the token stream, if known
+        @param expected Descriptions of the tokens that would have been accepted
+        @param found The offending Token, or None at the end of the input
+        """
+        super().__init__(message)
+        self.tokenIndex = tokenIndex
+        self.expected = tuple(expected)
+        self.found = found
+        # Set once a recovering CompilerParser has added this error to its diagnostics
+        self.recorded = False
+
+
+class Diagnostic():
+
+    def __init__(self, tokenIndex, expected, found, message):
+        """
+        A parse error recorded by CompilerParser in recovery mode
+        @param tokenIndex The index of the offending token in the token stream
+        @param expected Descriptions of the tokens that would have been accepted
+        @param found The offending Token, or None at the end of the input
+        @param message A description of the error
+        """
+        self.tokenIndex = tokenIndex
+        self.expected = expected
+        self.found = found
+        self.message = message
+
+
+    @staticmethod
+    def fromException(error):
+        """
+        @param error A ParseException
+        @return a Diagnostic with the same details
+        """
+        return Diagnostic(error.tokenIndex, error.expected, error.found, str(error))
+
+
+    def __str__(self):
+        """
+        @return the message, prefixed by the token index
+        """
+        return "token %s: %s" % (self.tokenIndex, self.message)
+
+
+# Returned by getChildren() on leaves, which never allocate a list of their own
+NO_CHILDREN = ()
 
 
 class ParseTree():
 
+    __slots__ = ("node_type", "value", "children", "digest")
+
     def __init__(self, node_type, value):
         """
         A node in a Parse Tree data structure
         @param node_type The type of node (see element types).
         @param value The node's value. Should only be used on terminal nodes/leaves, and empty otherwise.
         """
-        self.node_type = node_type
+        self.node_type = sys.intern(node_type)
         self.value = value
-        self.children = []
+        self.children = None
+        # Filled in by getDigest()
+        self.digest = None
     
 
     def addChild(self,child):
@@ -24,14 +80,19 @@ class ParseTree():
         Adds a ParseTree as a child of this ParseTree
         @param child The ParseTree to add
         """
-        self.children.append(child)
+        if self.children is None:
+            self.children = [child]
+        else:
+            self.children.append(child)
     
 
     def getChildren(self):
         """
         Get a list of child nodes in the order they were added.
-        @return A LinkedList of ParseTrees
+        @return A list of ParseTrees, or an empty tuple for a leaf
         """
+        if self.children is None:
+            return NO_CHILDREN
         return self.children
     
 
@@ -49,39 +110,281 @@ class ParseTree():
         @return The node's value. Should only be used on terminal nodes/leaves, and empty otherwise.
         """
         return self.value
+
+
+    def getDigest(self):
+        """
+        Get a hash of the subtree rooted here, computed bottom-up from the children's hashes and
+        cached on each node, so a subtree shared between trees is only ever hashed once.
+        The tree must not be changed after this is called.
+        @return a 16-byte digest, equal for subtrees of equal structure and values
+        """
+        # Nodes still to hash in pre-order, so hashing them in reverse does children before parents
+        order = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.digest is None:
+                order.append(node)
+                if node.children:
+                    stack.extend(node.children)
+
+        # Imported here so loading ParseTree stays cheap for callers that never diff trees
+        from hashlib import blake2b
+        for node in reversed(order):
+            if node.digest is not None:
+                # A shared Token met more than once
+                continue
+            if node.value is not None:
+                node.digest = blake2b(node.node_type.encode() + b"\1" + node.value.encode(), digest_size=16).digest()
+            else:
+                digest = blake2b(node.node_type.encode() + b"\2", digest_size=16)
+                for child in node.getChildren():
+                    digest.update(child.digest)
+                node.digest = digest.digest()
+        return self.digest
     
 
+    def walk(self):
+        """
+        Generate every node of this ParseTree in pre-order (each node before its children).
+        Uses an explicit stack, so deep trees can't hit the recursion limit.
+        @return a generator of ParseTrees
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            # Read once, as a view's children are built on every read
+            children = node.children
+            if children:
+                stack.extend(reversed(children))
+
+
+    def height(self):
+        """
+        Get the number of nodes on the longest path from this node down to a leaf
+        @return the height, 1 for a leaf
+        """
+        height = 0
+        stack = [(self, 1)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > height:
+                height = depth
+            children = node.children
+            if children:
+                for child in children:
+                    stack.append((child, depth + 1))
+        return height
+
+
+    def equals(self,other):
+        """
+        Check if another ParseTree has the same shape, node types and values as this one
+        @param other The ParseTree to compare with
+        @return True if the trees match, False otherwise
+        """
+        stack = [(self, other)]
+        while stack:
+            left, right = stack.pop()
+            if left is right:
+                continue
+            if left.node_type != right.node_type or left.value != right.value:
+                return False
+            leftChildren = left.getChildren()
+            rightChildren = right.getChildren()
+            if len(leftChildren) != len(rightChildren):
+                return False
+            stack.extend(zip(leftChildren, rightChildren))
+        return True
+
+
+    def toFlat(self):
+        """
+        Convert this ParseTree to a flat list that is cheap to pickle or store:
+        the node type, value and number of children of every node, in pre-order
+        @return a list of [node_type, value, child count, node_type, value, child count, ...]
+        """
+        flat = []
+        append = flat.append
+        stack = [self]
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            node = pop()
+            # Read once, as a view's children are built on every read
+            children = node.children
+            append(node.node_type)
+            append(node.value)
+            if children:
+                append(len(children))
+                extend(reversed(children))
+            else:
+                append(0)
+        return flat
+
+
+    @staticmethod
+    def fromFlat(flat):
+        """
+        Rebuild a ParseTree from the output of toFlat()
+        @param flat The flat list
+        @return the root ParseTree, with Tokens as its leaves
+        """
+        root = None
+        # Children lists still being filled, with the number of children each will hold
+        stack = []
+        fields = iter(flat)
+        for node_type, value, count in zip(fields, fields, fields):
+            if value is None:
+                node = ParseTree(node_type, None)
+            else:
+                node = sharedTokens.get((node_type, value))
+                if node is None:
+                    node = makeToken(node_type, value)
+
+            if stack:
+                children, expected = stack[-1]
+                children.append(node)
+                if len(children) == expected:
+                    stack.pop()
+            else:
+                root = node
+
+            if count:
+                node.children = []
+                stack.append((node.children, count))
+        return root
+
+
     def __str__(self,depth=0):
         """
         Generate a string from this ParseTree
         @return A printable representation of this ParseTree with indentation
         """        
-        # Set indentation
-        indent = ""
-        for i in range(0,depth):
-            indent += "  \u2502 "
-        
-        # Generate output
-        output = ""
-        if(len(self.children)>0):
-            # Output if the node has children
-            output += self.node_type + "\n"
-            for child in self.children:
-                output += indent + "  \u2514 " + child.__str__(depth+1)
-            
-            output += indent + "\n"
-        else :
-            # Output if the node is a leaf/terminal
-            output += self.node_type + " " + self.value + "\n"
-        
-        return output
+        return "".join(self.iterChunks(depth))
+
+
+    def writeTo(self,stream,depth=0):
+        """
+        Write the text of __str__ to a stream without building it in memory first
+        @param stream Any object with a write() method accepting strings
+        """
+        write = stream.write
+        for chunk in self.iterChunks(depth):
+            write(chunk)
+
+
+    def iterChunks(self,depth=0):
+        """
+        Generate the text of __str__ piece by piece.
+        Walks the tree with an explicit stack, so deep trees can't hit the recursion limit.
+        @return a generator of strings that concatenate to str(self)
+        """
+        # Indentation strings, built once per depth
+        closers = []
+        branches = []
+
+        # Holds nodes still to print, with their depth, and text to print after their siblings
+        stack = [(self, depth)]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                yield item
+                continue
+
+            node, depth = item
+            children = node.children
+            if(children or node.value is None):
+                # Output if the node has children, or is a non-terminal left empty
+                while len(closers) <= depth:
+                    indent = "  \u2502 " * len(closers)
+                    closers.append(indent + "\n")
+                    branches.append(indent + "  \u2514 ")
+
+                yield node.node_type + "\n"
+                stack.append(closers[depth])
+                branch = branches[depth]
+                for child in reversed(children or NO_CHILDREN):
+                    stack.append((child, depth + 1))
+                    stack.append(branch)
+            else :
+                # Output if the node is a leaf/terminal
+                yield node.node_type + " " + node.value + "\n"
 
     
 
+class TreeView():
+
+    """
+    The read API of ParseTree for a view of a node held in some other storage, such as an ArenaNode
+    or a TreeFileNode. Subclasses provide node_type and value properties and getChildren().
+    """
+    __slots__ = ()
+
+
+    @property
+    def children(self):
+        """
+        @return views of the child nodes, or None for a leaf, as ParseTree.children
+        """
+        children = self.getChildren()
+        return children if children else None
+
+
+    def getType(self):
+        """
+        Get the type of this node
+        @return The type of node (see element types).
+        """
+        return self.node_type
+
+
+    def getValue(self):
+        """
+        Get the value of this node
+        @return The node's value. Should only be used on terminal nodes/leaves, and empty otherwise.
+        """
+        return self.value
+
+
+    # Traversal and output work on any node with node_type, value and children
+    walk = ParseTree.walk
+    height = ParseTree.height
+    equals = ParseTree.equals
+    toFlat = ParseTree.toFlat
+    iterChunks = ParseTree.iterChunks
+    writeTo = ParseTree.writeTo
+    __str__ = ParseTree.__str__
+
+
 class Token(ParseTree):
 
     """
     Token for parsing. Can be used as a terminal node in a ParseTree
     """
-    pass
-    
+    __slots__ = ()
+
+
+# Keywords and symbols always carry the same value, so one Token of each is shared
+SHARED_TOKEN_TYPES = frozenset(["keyword", "symbol"])
+sharedTokens = {}
+
+
+def makeToken(node_type, value):
+    """
+    Create a Token, reusing a single shared instance for each keyword and symbol
+    @param node_type The type of token (see element types).
+    @param value The token's text
+    @return a Token, which must not be given children
+    """
+    if node_type not in SHARED_TOKEN_TYPES:
+        return Token(node_type, value)
+
+    key = (node_type, value)
+    token = sharedTokens.get(key)
+    if token is None:
+        token = sharedTokens[key] = Token(node_type, sys.intern(value))
+    return token
+
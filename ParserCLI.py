@@ -0,0 +1,187 @@
+"""
+Command-line entry point for the Jack parser.
+
+Usage: python ParserCLI.py [--mode MODE] [--iterative] [-o OUTPUT] [FILE ...]
+
+Reads each FILE, or standard input if there are none or FILE is "-", and writes:
+  text         the parse tree as text (the default)
+  binary       the parse tree in the binary tree file format; OUTPUT is a file,
+               or a directory with one <name>.jpt per input when there are several.
+               Without -o it goes to standard output, unless that is a terminal
+  diagnostics  every parse error, carrying on past each one
+  stats        token and node counts, tree height and parse time
+  vm           VM code for the class
+
+Only the modules a mode needs are imported, so short runs aren't dominated by startup.
+Exits with 0 on success, 1 if any input failed to parse, and 2 on bad usage.
+"""
+import sys
+
+
+MODES = ("text", "binary", "diagnostics", "stats", "vm")
+
+USAGE = "Usage: python ParserCLI.py [--mode " + "|".join(MODES) + "] [--iterative] [-o OUTPUT] [FILE ...]"
+
+
+class UsageError(Exception):
+    """
+    Raised for command-line arguments that can't be used
+    """
+    pass
+
+
+def parseArguments(arguments):
+    """
+    Read the command-line options. argparse isn't used, as importing it costs more than a small parse.
+    @param arguments The arguments, without the program name
+    @return a dict of mode, iterative, output and inputs
+    @throws UsageError if the arguments can't be used
+    """
+    options = {"mode": "text", "iterative": False, "output": None, "inputs": []}
+    arguments = list(arguments)
+    while arguments:
+        argument = arguments.pop(0)
+        if argument in ("-m", "--mode") or argument in ("-o", "--output"):
+            if not arguments:
+                raise UsageError(argument + " needs a value")
+            if argument in ("-m", "--mode"):
+                options["mode"] = arguments.pop(0)
+            else:
+                options["output"] = arguments.pop(0)
+        elif argument == "--iterative":
+            options["iterative"] = True
+        elif argument.startswith("-") and argument != "-":
+            raise UsageError("Unknown option " + argument)
+        else:
+            options["inputs"].append(argument)
+
+    if options["mode"] not in MODES:
+        raise UsageError("Unknown mode " + options["mode"])
+    if not options["inputs"]:
+        options["inputs"].append("-")
+    if options["output"] is not None and options["mode"] != "binary":
+        raise UsageError("-o is only used with --mode binary")
+    return options
+
+
+def binaryDestination(name, output, inputs):
+    """
+    @param name The input being written
+    @param output The -o option, or None
+    @param inputs Every input
+    @return where to write the binary tree of the input: a path, or a binary stream
+    @throws UsageError if several inputs would have to share one destination,
+            or binary data would be written to a terminal
+    """
+    import os
+
+    if len(inputs) == 1:
+        if output is not None:
+            return output
+        if sys.stdout.isatty():
+            raise UsageError("Binary output isn't written to a terminal; redirect it or use -o")
+        return sys.stdout.buffer
+    if output is None or not os.path.isdir(output):
+        raise UsageError("-o must name a directory when there are several inputs")
+    base = "stdin" if name == "-" else os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(output, base + ".jpt")
+
+
+def run(options, out, err):
+    """
+    Parse every input and write its output in the chosen mode
+    @param options The dict from parseArguments
+    @param out The text stream for results
+    @param err The text stream for errors
+    @return the exit status
+    """
+    status = 0
+    try:
+        for name in options["inputs"]:
+            if not runInput(name, options, out, err):
+                status = 1
+    except BrokenPipeError:
+        # The reader went away, e.g. output piped into head; stop quietly but keep any failure already seen
+        sys.stdout = None
+    return status
+
+
+def runInput(name, options, out, err):
+    """
+    Parse one input and write its output in the chosen mode
+    @param name A file path, or "-" for standard input
+    @param options The dict from parseArguments
+    @param out The text stream for results
+    @param err The text stream for errors
+    @return True if the input parsed without errors
+    """
+    from CompilerParser import CompilerParser
+    from JackTokenizer import JackTokenizer
+    from ParseTree import ParseException
+
+    mode = options["mode"]
+    label = "<stdin>" if name == "-" else name
+    if mode == "binary":
+        # Fail on bad usage before any work is done
+        destination = binaryDestination(name, options["output"], options["inputs"])
+    if mode == "stats":
+        from time import perf_counter
+        start = perf_counter()
+
+    tokens = JackTokenizer(sys.stdin if name == "-" else name)
+    parser = CompilerParser(tokens, options["iterative"], recover=mode == "diagnostics", symbols=mode == "vm")
+    try:
+        tree = parser.compileProgram()
+    except (ParseException, OSError, UnicodeDecodeError) as e:
+        err.write("%s: %s\n" % (label, str(e) or type(e).__name__))
+        return False
+    except RecursionError:
+        err.write("%s: nesting too deep for the recursive parser; use --iterative\n" % label)
+        return False
+
+    if mode == "text":
+        tree.writeTo(out)
+    elif mode == "binary":
+        from TreeFile import writeTree
+        writeTree(tree, destination)
+    elif mode == "diagnostics":
+        for diagnostic in parser.diagnostics:
+            out.write("%s: %s\n" % (label, diagnostic))
+        return not parser.diagnostics
+    elif mode == "stats":
+        seconds = perf_counter() - start
+        tokens = parser.tokens.position
+        out.write("%s: %d tokens, %d nodes, height %d, %.3fs, %.0f tokens/s\n" % (
+            label, tokens, sum(1 for node in tree.walk()), tree.height(), seconds,
+            tokens / seconds if seconds else 0.0))
+    elif mode == "vm":
+        from CodeGenerator import CodeGenerator, CodeGenerationException
+        try:
+            CodeGenerator(out, parser.symbols).generate(tree)
+        except CodeGenerationException as e:
+            err.write("%s: %s\n" % (label, e))
+            return False
+    return True
+
+
+def main(arguments=None):
+    """
+    Run the command line
+    @param arguments The arguments, without the program name; sys.argv[1:] if None
+    @return the exit status
+    """
+    if arguments is None:
+        arguments = sys.argv[1:]
+    if "-h" in arguments or "--help" in arguments:
+        sys.stdout.write(__doc__.strip() + "\n")
+        return 0
+    try:
+        options = parseArguments(arguments)
+        return run(options, sys.stdout, sys.stderr)
+    except UsageError as e:
+        sys.stderr.write("%s\n%s\n" % (e, USAGE))
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import time
+
+
+# The compile methods that parse a grammar rule. Helpers such as compileRecovering, and the
+# explicit-stack loops behind compileStatements and compileExpression, aren't rules of their own.
+GRAMMAR_RULES = (
+    "compileProgram", "compileClass", "compileClassMember", "compileClassVarDec",
+    "compileSubroutine", "compileConstructorHeader", "compileParameterList", "compileSubroutineBody",
+    "compileVarDec", "compileStatements", "compileLet", "compileIf", "compileWhile", "compileDo",
+    "compileReturn", "compileExpression", "compileTerm", "compileExpressionList",
+)
+
+
+class RuleStats():
+
+    def __init__(self, rule):
+        """
+        Counters for one grammar rule (compile method)
+        @param rule The name of the compile method
+        """
+        self.rule = rule
+        self.calls = 0
+        self.cumulativeTime = 0.0
+        self.selfTime = 0.0
+        self.tokens = 0
+        self.lookaheads = 0
+
+
+class ParserProfiler():
+
+    def __init__(self, parser):
+        """
+        Records per-rule call counts, timings, tokens consumed and have() checks for a CompilerParser.
+        The parser is only touched between install() and uninstall(), so it runs at full speed otherwise.
+        @param parser The CompilerParser to profile
+        """
+        self.parser = parser
+        self.stats = {}
+        # Open calls: [stats, start time, time spent in nested calls, start token, path id, outermost call of the rule]
+        self.stack = []
+        # Call paths as a trie: (parent path id, rule) -> path id, and the self time of each path
+        self.paths = {}
+        self.pathNames = []
+        self.pathParents = []
+        self.pathTimes = []
+        self.active = {}
+        self.rules = list(GRAMMAR_RULES)
+
+
+    def install(self):
+        """
+        Start recording by wrapping the parser's compile methods and have()
+        @return this profiler
+        """
+        for rule in self.rules:
+            setattr(self.parser, rule, self.wrap(rule, getattr(self.parser, rule)))
+        self.parser.have = self.wrapHave(self.parser.have)
+        return self
+
+
+    def uninstall(self):
+        """
+        Stop recording and restore the parser's own methods
+        """
+        for rule in self.rules + ["have"]:
+            self.parser.__dict__.pop(rule, None)
+
+
+    def __enter__(self):
+        return self.install()
+
+
+    def __exit__(self, *exception):
+        self.uninstall()
+
+
+    def wrap(self, rule, method):
+        """
+        @return a function that calls a compile method and records it
+        """
+        stats = self.stats.setdefault(rule, RuleStats(rule))
+        stack = self.stack
+        active = self.active
+        tokens = self.parser.tokens
+        clock = time.perf_counter
+
+        def profiled(*arguments):
+            parentPath = stack[-1][4] if stack else -1
+            outermost = not active.get(rule)
+            active[rule] = active.get(rule, 0) + 1
+            stack.append([stats, clock(), 0.0, tokens.position, self.path(parentPath, rule), outermost])
+            try:
+                return method(*arguments)
+            finally:
+                frame = stack.pop()
+                elapsed = clock() - frame[1]
+                selfTime = elapsed - frame[2]
+                active[rule] -= 1
+                stats.calls += 1
+                stats.selfTime += selfTime
+                self.pathTimes[frame[4]] += selfTime
+                # Recursive calls are already inside the outermost call's totals
+                if frame[5]:
+                    stats.cumulativeTime += elapsed
+                    stats.tokens += tokens.position - frame[3]
+                if stack:
+                    stack[-1][2] += elapsed
+
+        return profiled
+
+
+    def wrapHave(self, method):
+        """
+        @return a function that calls have() and counts it against the rule being parsed
+        """
+        stack = self.stack
+
+        def profiled(expectedType, expectedValue):
+            if stack:
+                stack[-1][0].lookaheads += 1
+            return method(expectedType, expectedValue)
+
+        return profiled
+
+
+    def path(self, parent, rule):
+        """
+        @return the id of the call path formed by calling rule from the parent path
+        """
+        key = (parent, rule)
+        path = self.paths.get(key)
+        if path is None:
+            path = self.paths[key] = len(self.pathNames)
+            self.pathNames.append(rule)
+            self.pathParents.append(parent)
+            self.pathTimes.append(0.0)
+        return path
+
+
+    def foldedStacks(self):
+        """
+        Export self time per call path in the folded format read by flamegraph.pl and speedscope
+        @return a list of lines like "compileClass;compileSubroutine;compileLet 1234", in microseconds
+        """
+        lines = []
+        names = {}
+        for path in range(len(self.pathNames)):
+            parent = self.pathParents[path]
+            name = self.pathNames[path]
+            names[path] = name if parent < 0 else names[parent] + ";" + name
+            micros = int(round(self.pathTimes[path] * 1e6))
+            if micros > 0:
+                lines.append("%s %d" % (names[path], micros))
+        return lines
+
+
+    def report(self):
+        """
+        Summarise the counters, slowest rules (by self time) first
+        @return a printable table
+        """
+        lines = ["%-28s %8s %10s %10s %8s %10s" % ("rule", "calls", "cum ms", "self ms", "tokens", "have()")]
+        for stats in sorted(self.stats.values(), key=lambda stats: -stats.selfTime):
+            if stats.calls:
+                lines.append("%-28s %8d %10.2f %10.2f %8d %10d" % (
+                    stats.rule, stats.calls, stats.cumulativeTime * 1e3, stats.selfTime * 1e3,
+                    stats.tokens, stats.lookaheads))
+        return "\n".join(lines)
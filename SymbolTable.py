@@ -0,0 +1,137 @@
+class Symbol():
+
+    __slots__ = ("name", "kind", "type", "index")
+
+    def __init__(self, name, kind, type, index):
+        """
+        A declared variable
+        @param name The variable's name
+        @param kind "static", "field", "argument" or "local"
+        @param type The declared type, e.g. "int"
+        @param index The variable's number among those of the same kind in its scope
+        """
+        self.name = name
+        self.kind = kind
+        self.type = type
+        self.index = index
+
+
+    def __repr__(self):
+        return "Symbol(%r, %r, %r, %d)" % (self.name, self.kind, self.type, self.index)
+
+
+# Kinds declared in the class scope; the others belong to a subroutine
+CLASS_KINDS = frozenset(["static", "field"])
+
+
+class SymbolTable():
+
+    def __init__(self):
+        """
+        Class and subroutine scoped symbols, plus an index of where each identifier is used.
+        Filled in by CompilerParser while it parses, when created with symbols=True.
+        """
+        self.className = None
+        self.classScope = {}
+        # Subroutine name -> its scope, kept after the subroutine has been parsed
+        self.subroutineScopes = {}
+        self.subroutineKinds = {}
+        self.subroutineScope = {}
+        self.counts = dict.fromkeys(["static", "field", "argument", "local"], 0)
+        # Identifier -> token positions where it appears
+        self.uses = {}
+
+
+    def startClass(self, name):
+        """
+        Start the class scope
+        @param name The class name
+        """
+        self.className = name
+
+
+    def startSubroutine(self, name, kind):
+        """
+        Start a new subroutine scope; later lookups without a subroutine name use it
+        @param name The subroutine name
+        @param kind "constructor", "function" or "method"
+        """
+        self.subroutineScope = self.subroutineScopes[name] = {}
+        self.subroutineKinds[name] = kind
+        self.counts["argument"] = 0
+        self.counts["local"] = 0
+        if kind == "method":
+            # A method's object is passed as its first argument
+            self.define("this", self.className, "argument")
+
+
+    def define(self, name, type, kind):
+        """
+        Declare a variable in the scope its kind belongs to
+        @param name The variable's name
+        @param type The declared type
+        @param kind "static", "field", "argument" or "local"
+        @return the new Symbol
+        """
+        symbol = Symbol(name, kind, type, self.counts[kind])
+        self.counts[kind] += 1
+        if kind in CLASS_KINDS:
+            self.classScope[name] = symbol
+        else:
+            self.subroutineScope[name] = symbol
+        return symbol
+
+
+    def recordUse(self, name, position):
+        """
+        Add a token position to an identifier's uses
+        @param name The identifier
+        @param position The token's index in the token stream
+        """
+        positions = self.uses.get(name)
+        if positions is None:
+            self.uses[name] = [position]
+        else:
+            positions.append(position)
+
+
+    def lookup(self, name, subroutine=None):
+        """
+        Find a variable, looking in the subroutine scope before the class scope
+        @param name The variable's name
+        @param subroutine The subroutine whose scope to look in, or None for the current one
+        @return the Symbol, or None if the name isn't a declared variable
+        """
+        scope = self.subroutineScope if subroutine is None else self.subroutineScopes.get(subroutine, {})
+        symbol = scope.get(name)
+        if symbol is None:
+            symbol = self.classScope.get(name)
+        return symbol
+
+
+    def varCount(self, kind, subroutine=None):
+        """
+        Count the variables of one kind
+        @param kind "static", "field", "argument" or "local"
+        @param subroutine For argument and local, the subroutine to count in, or None for the current one
+        @return the number of variables declared
+        """
+        if kind in CLASS_KINDS:
+            scope = self.classScope
+        elif subroutine is None:
+            scope = self.subroutineScope
+        else:
+            scope = self.subroutineScopes.get(subroutine, {})
+        count = 0
+        for symbol in scope.values():
+            if symbol.kind == kind:
+                count += 1
+        return count
+
+
+    def usesOf(self, name):
+        """
+        @param name An identifier
+        @return the token positions where it appears, in order
+        """
+        return self.uses.get(name, [])
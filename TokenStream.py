@@ -0,0 +1,103 @@
+class TokenStream():
+
+    # Consumed tokens are dropped from the buffer of a lazy source in batches of this size
+    COMPACT_SIZE = 1024
+
+    def __init__(self, tokens):
+        """
+        A read-only cursor over a sequence of tokens
+        @param tokens The tokens to read. A list or tuple is copied and never modified;
+                      any other iterable (e.g. a tokenizer generator) is pulled lazily,
+                      buffering only the tokens between the oldest mark and the lookahead.
+        """
+        if tokens is None:
+            tokens = ()
+        if isinstance(tokens, (list, tuple)):
+            self.tokens = tuple(tokens)
+            self.source = None
+        else:
+            self.tokens = []
+            self.source = iter(tokens)
+        self.offset = 0
+        self.position = 0
+        self.marks = []
+
+
+    def current(self):
+        """
+        Get the token under the cursor
+        @return the token, or None once every token has been consumed
+        """
+        return self.peek(0)
+
+
+    def peek(self,k=1):
+        """
+        Look ahead of the cursor without advancing
+        @param k How many tokens past the current one to look (0 is the current token)
+        @return the token, or None if the stream ends first
+        """
+        index = self.position - self.offset + k
+        while index >= len(self.tokens) and self.source is not None:
+            self.fill()
+        if index < len(self.tokens):
+            return self.tokens[index]
+        return None
+
+
+    def advance(self):
+        """
+        Move the cursor to the next token
+        @return the token that was current prior to advancing
+        """
+        token = self.current()
+        if token is not None:
+            self.position += 1
+            if self.source is not None and not self.marks and self.position - self.offset >= self.COMPACT_SIZE:
+                del self.tokens[:self.position - self.offset]
+                self.offset = self.position
+        return token
+
+
+    def mark(self):
+        """
+        Remember the cursor position so it can be restored later.
+        Tokens from a lazy source are kept buffered until the mark is released.
+        @return a mark to pass to reset() and release()
+        """
+        self.marks.append(self.position)
+        return self.position
+
+
+    def reset(self,mark):
+        """
+        Move the cursor back to a position returned by mark()
+        @param mark The mark to restore
+        """
+        self.position = mark
+
+
+    def release(self,mark):
+        """
+        Forget a mark once it will no longer be reset to
+        @param mark The mark returned by mark()
+        """
+        self.marks.remove(mark)
+
+
+    def atEnd(self):
+        """
+        Check if every token has been consumed
+        @return True if no tokens remain, False otherwise
+        """
+        return self.current() is None
+
+
+    def fill(self):
+        """
+        Pull the next token from a lazy source into the buffer
+        """
+        try:
+            self.tokens.append(next(self.source))
+        except StopIteration:
+            self.source = None
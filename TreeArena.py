@@ -0,0 +1,196 @@
+from array import array
+
+from ParseTree import TreeView, NO_CHILDREN
+
+
+# Stored in place of a node or string index when there is none
+NONE = -1
+
+
+class TreeArena():
+
+    def __init__(self):
+        """
+        Stores a parse tree in parallel integer columns instead of one object per node.
+        Node types and values are indexes into a shared string table; links are node indexes.
+        """
+        self.strings = []
+        self.stringIndexes = {}
+        self.types = array("i")
+        self.values = array("i")
+        self.parents = array("i")
+        self.firstChildren = array("i")
+        self.nextSiblings = array("i")
+        # Kept so appending a child doesn't walk the sibling chain
+        self.lastChildren = array("i")
+
+
+    def __len__(self):
+        """
+        @return the number of nodes in the arena
+        """
+        return len(self.types)
+
+
+    def intern(self, string):
+        """
+        Add a string to the string table
+        @param string The string, or None
+        @return its index in the string table, or NONE for None
+        """
+        if string is None:
+            return NONE
+        index = self.stringIndexes.get(string)
+        if index is None:
+            index = self.stringIndexes[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+    def newNode(self, node_type, value=None):
+        """
+        Add a node with no parent or children
+        @param node_type The type of node (see element types).
+        @param value The node's value, or None for a non-terminal
+        @return the index of the new node
+        """
+        self.types.append(self.intern(node_type))
+        self.values.append(self.intern(value))
+        self.parents.append(NONE)
+        self.firstChildren.append(NONE)
+        self.nextSiblings.append(NONE)
+        self.lastChildren.append(NONE)
+        return len(self.types) - 1
+
+
+    def newTree(self, node_type):
+        """
+        Add an empty non-terminal node
+        @param node_type The type of node (see element types).
+        @return an ArenaNode view of the new node
+        """
+        return ArenaNode(self, self.newNode(node_type))
+
+
+    def append(self, parent, child):
+        """
+        Make a node the last child of another
+        @param parent The index of the parent node
+        @param child The index of a node with no parent
+        """
+        last = self.lastChildren[parent]
+        if last == NONE:
+            self.firstChildren[parent] = child
+        else:
+            self.nextSiblings[last] = child
+        self.lastChildren[parent] = child
+        self.parents[child] = parent
+
+
+    def importTree(self, tree):
+        """
+        Copy a ParseTree (or anything with the same interface) into the arena
+        @param tree The root of the tree to copy
+        @return the index of the copied root
+        """
+        root = self.newNode(tree.getType(), tree.getValue())
+        stack = [(tree, root)]
+        while stack:
+            node, index = stack.pop()
+            for child in node.getChildren():
+                childIndex = self.newNode(child.getType(), child.getValue())
+                self.append(index, childIndex)
+                stack.append((child, childIndex))
+        return root
+
+
+    def node(self, index):
+        """
+        @param index The index of a node
+        @return an ArenaNode view of the node
+        """
+        return ArenaNode(self, index)
+
+
+    def columns(self):
+        """
+        Get zero-copy views of the node columns, e.g. for numpy.frombuffer().
+        The views must be released before more nodes are added.
+        @return a dict of column name to memoryview of 32-bit ints
+        """
+        return {
+            "types": memoryview(self.types),
+            "values": memoryview(self.values),
+            "parents": memoryview(self.parents),
+            "firstChildren": memoryview(self.firstChildren),
+            "nextSiblings": memoryview(self.nextSiblings),
+        }
+
+
+class ArenaNode(TreeView):
+
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        """
+        A lightweight view of one node in a TreeArena, with the same read API as ParseTree
+        @param arena The TreeArena holding the node
+        @param index The index of the node
+        """
+        self.arena = arena
+        self.index = index
+
+
+    @property
+    def node_type(self):
+        """
+        @return the node's type, as ParseTree.node_type
+        """
+        return self.arena.strings[self.arena.types[self.index]]
+
+
+    @property
+    def value(self):
+        """
+        @return the node's value, as ParseTree.value
+        """
+        index = self.arena.values[self.index]
+        return None if index == NONE else self.arena.strings[index]
+
+
+    def addChild(self, child):
+        """
+        Adds a node as the last child of this node
+        @param child An ArenaNode from the same arena, or a ParseTree/Token to copy in
+        """
+        arena = self.arena
+        if child.__class__ is ArenaNode and child.arena is arena:
+            arena.append(self.index, child.index)
+        elif not child.getChildren():
+            arena.append(self.index, arena.newNode(child.getType(), child.getValue()))
+        else:
+            arena.append(self.index, arena.importTree(child))
+
+
+    def getChildren(self):
+        """
+        Get views of the child nodes in the order they were added.
+        @return A list of ArenaNodes, or an empty tuple for a leaf
+        """
+        arena = self.arena
+        child = arena.firstChildren[self.index]
+        if child == NONE:
+            return NO_CHILDREN
+        children = []
+        while child != NONE:
+            children.append(ArenaNode(arena, child))
+            child = arena.nextSiblings[child]
+        return children
+
+
+    def getParent(self):
+        """
+        @return a view of this node's parent, or None for a root
+        """
+        parent = self.arena.parents[self.index]
+        return None if parent == NONE else ArenaNode(self.arena, parent)
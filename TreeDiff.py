@@ -0,0 +1,104 @@
+from difflib import SequenceMatcher
+
+
+# Nodes reported when they differ: class members and statements
+REPORTED_TYPES = frozenset([
+    "classVarDec", "subroutine",
+    "letStatement", "ifStatement", "whileStatement", "doStatement", "returnStatement",
+])
+
+
+class TreeChange():
+
+    def __init__(self, kind, old, new, path):
+        """
+        A class member or statement that differs between two parse trees
+        @param kind "added", "removed" or "changed"
+        @param old The node in the old tree, or None if it was added
+        @param new The node in the new tree, or None if it was removed
+        @param path The node types from the root down to the node, e.g. ["class", "subroutine"]
+        """
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.path = path
+
+
+    def __str__(self):
+        """
+        @return the kind of change and the path of the node
+        """
+        return self.kind + " " + "/".join(self.path)
+
+
+def reportedWithin(node, path):
+    """
+    Find the outermost reported nodes in a subtree, e.g. the statements inside a statements node
+    @param node The root of the subtree
+    @param path The node types from the root of the tree down to node's parent
+    @return a list of (node, path) pairs in document order
+    """
+    found = []
+    stack = [(node, path)]
+    while stack:
+        node, path = stack.pop()
+        path = path + [node.node_type]
+        if node.node_type in REPORTED_TYPES:
+            found.append((node, path))
+        elif node.children:
+            for child in reversed(node.children):
+                stack.append((child, path))
+    return found
+
+
+def diffTrees(old, new):
+    """
+    Compare two parse trees, skipping every subtree whose digest is unchanged.
+    Digests are cached on the nodes (see ParseTree.getDigest), so subtrees shared between the trees,
+    such as the untouched members of an IncrementalParser update, cost nothing, and the work done
+    follows the size of the change rather than the size of the trees.
+    A changed node is reported along with any changed class members or statements inside it.
+    @param old The root of the old ParseTree
+    @param new The root of the new ParseTree
+    @return a list of TreeChanges, outer nodes before the nodes inside them
+    """
+    changes = []
+    stack = [(old, new, [])]
+    while stack:
+        oldNode, newNode, path = stack.pop()
+        if oldNode is newNode or oldNode.getDigest() == newNode.getDigest():
+            continue
+
+        path = path + [newNode.node_type]
+        if newNode.node_type in REPORTED_TYPES:
+            changes.append(TreeChange("changed", oldNode, newNode, path))
+
+        oldChildren = oldNode.getChildren()
+        newChildren = newNode.getChildren()
+        matcher = SequenceMatcher(None,
+            [child.getDigest() for child in oldChildren],
+            [child.getDigest() for child in newChildren],
+            autojunk=False)
+
+        # Pairs of children to look inside, pushed in reverse so they are visited in document order
+        pairs = []
+        for tag, oldStart, oldEnd, newStart, newEnd in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            # Replaced children of the same type are compared node by node
+            while oldStart < oldEnd and newStart < newEnd and \
+                    oldChildren[oldStart].node_type == newChildren[newStart].node_type:
+                if newChildren[newStart].value is None:
+                    pairs.append((oldChildren[oldStart], newChildren[newStart], path))
+                oldStart += 1
+                newStart += 1
+            for child in oldChildren[oldStart:oldEnd]:
+                for node, nodePath in reportedWithin(child, path):
+                    changes.append(TreeChange("removed", node, None, nodePath))
+            for child in newChildren[newStart:newEnd]:
+                for node, nodePath in reportedWithin(child, path):
+                    changes.append(TreeChange("added", None, node, nodePath))
+
+        stack.extend(reversed(pairs))
+
+    return changes
@@ -0,0 +1,224 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from ParseTree import ParseTree, TreeView, NO_CHILDREN
+
+
+# File layout, all integers little-endian:
+#   header:  magic, string count, node count, byte offset of the node records
+#   string table: (string count + 1) uint32 offsets into the UTF-8 blob that follows
+#   node records, in pre-order, 4 int32s each: type string, value string (-1 for none),
+#   number of children, number of nodes in the subtree rooted here
+MAGIC = b"JPT1"
+HEADER = struct.Struct("<4sIIQ")
+RECORD_SIZE = 4
+NONE = -1
+
+
+def littleEndian(column):
+    """
+    @param column An array to be written to or read from a file
+    @return the array, byte-swapped if this machine is big-endian
+    """
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def writeTree(tree, destination):
+    """
+    Write a parse tree in the binary tree file format
+    @param tree A ParseTree, or anything with the same interface
+    @param destination A file path, or a binary file-like object
+    """
+    # None is looked up like any string so each node costs two dict lookups
+    stringIndexes = {None: NONE}
+    flat = []
+    append = flat.append
+
+    for node in tree.walk():
+        node_type = node.node_type
+        value = node.value
+        typeIndex = stringIndexes.get(node_type)
+        if typeIndex is None:
+            typeIndex = stringIndexes[node_type] = len(stringIndexes) - 1
+        valueIndex = stringIndexes.get(value)
+        if valueIndex is None:
+            valueIndex = stringIndexes[value] = len(stringIndexes) - 1
+        children = node.children
+        append(typeIndex)
+        append(valueIndex)
+        append(len(children) if children else 0)
+        append(1)
+
+    records = array("i", flat)
+    del flat
+    del stringIndexes[None]
+    strings = list(stringIndexes)
+
+    # Work out subtree sizes from the last node back: each node's children are
+    # the subtrees completed just after it, sitting on top of the stack
+    sizes = []
+    for i in range(len(records) - RECORD_SIZE, -1, -RECORD_SIZE):
+        size = 1
+        for child in range(records[i + 2]):
+            size += sizes.pop()
+        records[i + 3] = size
+        sizes.append(size)
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 4)
+
+    nodesOffset = HEADER.size + len(offsets) * 4 + len(blob)
+    data = [
+        HEADER.pack(MAGIC, len(strings), len(records) // RECORD_SIZE, nodesOffset),
+        littleEndian(offsets).tobytes(),
+        bytes(blob),
+        littleEndian(records).tobytes(),
+    ]
+
+    if hasattr(destination, "write"):
+        for chunk in data:
+            destination.write(chunk)
+    else:
+        with open(destination, "wb") as file:
+            for chunk in data:
+                file.write(chunk)
+
+
+class TreeFile():
+
+    def __init__(self, path):
+        """
+        Opens a binary tree file by memory-mapping it. Nothing is decoded until it is accessed.
+        @param path The file to open
+        """
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.stringCount, self.nodeCount, nodesOffset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError("Not a parse tree file: " + str(path))
+
+        view = memoryview(self.map)
+        offsetsEnd = HEADER.size + (self.stringCount + 1) * 4
+        if sys.byteorder == "big":
+            # Columns can only be viewed in place on little-endian machines
+            self.offsets = littleEndian(array("I", view[HEADER.size:offsetsEnd].tobytes()))
+            self.records = littleEndian(array("i", view[nodesOffset:].tobytes()))
+        else:
+            self.offsets = view[HEADER.size:offsetsEnd].cast("I")
+            self.records = view[nodesOffset:nodesOffset + self.nodeCount * RECORD_SIZE * 4].cast("i")
+        self.blob = view[offsetsEnd:nodesOffset]
+        self.view = view
+        self.strings = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+    def close(self):
+        """
+        Unmap the file. Nodes read from it can no longer be used.
+        """
+        for column in (self.offsets, self.records, self.blob, self.view):
+            if isinstance(column, memoryview):
+                column.release()
+        self.map.close()
+
+
+    def string(self, index):
+        """
+        @param index An index into the string table, or NONE
+        @return the decoded string, or None
+        """
+        if index == NONE:
+            return None
+        string = self.strings.get(index)
+        if string is None:
+            start, end = self.offsets[index], self.offsets[index + 1]
+            string = self.strings[index] = str(self.blob[start:end], "utf-8")
+        return string
+
+
+    def root(self):
+        """
+        @return a TreeFileNode view of the root of the tree
+        """
+        return TreeFileNode(self, 0)
+
+
+class TreeFileNode(TreeView):
+
+    __slots__ = ("file", "index")
+
+    def __init__(self, file, index):
+        """
+        A view of one node in a TreeFile, with the same read API as ParseTree
+        @param file The TreeFile holding the node
+        @param index The pre-order index of the node
+        """
+        self.file = file
+        self.index = index
+
+
+    @property
+    def node_type(self):
+        """
+        @return the node's type, as ParseTree.node_type
+        """
+        return self.file.string(self.file.records[self.index * RECORD_SIZE])
+
+
+    @property
+    def value(self):
+        """
+        @return the node's value, as ParseTree.value
+        """
+        return self.file.string(self.file.records[self.index * RECORD_SIZE + 1])
+
+
+    def getChildren(self):
+        """
+        Get views of the child nodes, skipping over each child's subtree to find the next
+        @return A list of TreeFileNodes, or an empty tuple for a leaf
+        """
+        records = self.file.records
+        count = records[self.index * RECORD_SIZE + 2]
+        if count == 0:
+            return NO_CHILDREN
+        children = []
+        child = self.index + 1
+        for i in range(count):
+            children.append(TreeFileNode(self.file, child))
+            child += records[child * RECORD_SIZE + 3]
+        return children
+
+
+    def materialise(self):
+        """
+        Load the subtree rooted at this node into memory
+        @return a ParseTree copy of the subtree
+        """
+        records = self.file.records
+        string = self.file.string
+        flat = []
+        for i in range(self.index, self.index + records[self.index * RECORD_SIZE + 3]):
+            record = i * RECORD_SIZE
+            flat.append(string(records[record]))
+            flat.append(string(records[record + 1]))
+            flat.append(records[record + 2])
+        return ParseTree.fromFlat(flat)
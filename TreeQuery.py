@@ -0,0 +1,173 @@
+from array import array
+from bisect import bisect_left
+
+
+# Matches any node type in a path selector
+WILDCARD = "*"
+
+
+def viewContainer(node):
+    """
+    @param node A node of any parse tree
+    @return the TreeArena or TreeFile an ArenaNode or TreeFileNode views, or None for a ParseTree node
+    """
+    container = getattr(node, "arena", None)
+    if container is None:
+        container = getattr(node, "file", None)
+    return container
+
+
+class TreeIndex():
+
+    def __init__(self, tree):
+        """
+        Indexes a parse tree once so queries don't walk it again.
+        Nodes are numbered in pre-order, so each subtree is a contiguous run of numbers.
+        Keyword and symbol Tokens are shared between trees, so parent links and positions are only
+        kept for non-terminal nodes; Tokens are still found by their type.
+        ArenaNodes and TreeFileNodes are fresh views on every getChildren() call, so their nodes are
+        looked up by their index in the arena or file rather than by identity.
+        @param tree The root of a ParseTree, a TreeArena's ArenaNode or a TreeFile's TreeFileNode
+        """
+        self.nodes = []
+        self.parents = array("i")
+        self.sizes = array("i")
+        # Node type -> pre-order numbers of the nodes of that type, in increasing order
+        self.types = {}
+        # id() of each non-terminal, or its index for views -> its pre-order number
+        self.positions = {}
+        self.container = viewContainer(tree)
+        self.selections = {}
+
+        nodes = self.nodes
+        parents = self.parents
+        types = self.types
+        byIndex = self.container is not None
+        # Each entry is (node, parent number); an entry with no node closes the subtree of its number
+        stack = [(tree, -1)]
+        while stack:
+            node, parent = stack.pop()
+            if node is None:
+                self.sizes[parent] = len(nodes) - parent
+                continue
+
+            index = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+            self.sizes.append(1)
+            positions = types.get(node.node_type)
+            if positions is None:
+                types[node.node_type] = [index]
+            else:
+                positions.append(index)
+
+            if node.value is None:
+                self.positions[node.index if byIndex else id(node)] = index
+            children = node.children
+            if children:
+                stack.append((None, index))
+                for child in reversed(children):
+                    stack.append((child, index))
+
+
+    def __len__(self):
+        """
+        @return the number of nodes in the tree
+        """
+        return len(self.nodes)
+
+
+    def position(self, node):
+        """
+        @param node A non-terminal node of the indexed tree
+        @return its pre-order number
+        @throws KeyError if the node isn't a non-terminal of the indexed tree
+        """
+        if self.container is None:
+            return self.positions[id(node)]
+        if viewContainer(node) is not self.container:
+            raise KeyError(node)
+        return self.positions[node.index]
+
+
+    def findAll(self, node_type, within=None):
+        """
+        Find every node of a type, in document order
+        @param node_type The type of node (see element types), e.g. "letStatement"
+        @param within A non-terminal to search under instead of the whole tree
+        @return a list of nodes
+        """
+        positions = self.types.get(node_type, [])
+        if within is not None:
+            start = self.position(within)
+            positions = positions[bisect_left(positions, start + 1):bisect_left(positions, start + self.sizes[start])]
+        nodes = self.nodes
+        return [nodes[i] for i in positions]
+
+
+    def count(self, node_type):
+        """
+        @param node_type The type of node (see element types)
+        @return the number of nodes of that type in the tree
+        """
+        return len(self.types.get(node_type, ()))
+
+
+    def parent(self, node):
+        """
+        @param node A non-terminal node of the indexed tree
+        @return its parent, or None for the root
+        """
+        parent = self.parents[self.position(node)]
+        return None if parent < 0 else self.nodes[parent]
+
+
+    def ancestors(self, node):
+        """
+        @param node A non-terminal node of the indexed tree
+        @return its parent, grandparent and so on up to the root
+        """
+        ancestors = []
+        parent = self.parents[self.position(node)]
+        while parent >= 0:
+            ancestors.append(self.nodes[parent])
+            parent = self.parents[parent]
+        return ancestors
+
+
+    def select(self, path):
+        """
+        Find the nodes at the end of a path of node types, e.g. "subroutine/subroutineBody/statements".
+        Each step is a node type, or "*" for any type, and must be a child of the step before it.
+        The path may start anywhere, unless it begins with "/", which anchors it at the root.
+        Results are remembered, so asking for the same path again costs nothing.
+        @param path The path selector
+        @return a list of nodes in document order
+        """
+        selection = self.selections.get(path)
+        if selection is not None:
+            return selection
+
+        anchored = path.startswith("/")
+        steps = path.strip("/").split("/")
+        if steps[-1] == WILDCARD:
+            candidates = range(len(self.nodes))
+        else:
+            candidates = self.types.get(steps[-1], ())
+
+        nodes = self.nodes
+        parents = self.parents
+        selection = []
+        for index in candidates:
+            # Check the rest of the path by following parent links upwards
+            current = index
+            for step in reversed(steps[:-1]):
+                current = parents[current]
+                if current < 0 or (step != WILDCARD and nodes[current].node_type != step):
+                    break
+            else:
+                if not anchored or parents[current] < 0:
+                    selection.append(nodes[index])
+
+        self.selections[path] = selection
+        return selection
@@ -0,0 +1,71 @@
+"""
+Compares starting one Python process per file with sending the files to a
+running CompileServer: requests/s for cold (uncached) and warm requests.
+
+Usage: python benchmarks/compile_server.py [files] [workers]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from CompileServer import CompileClient
+from generator import JackGenerator, render
+
+
+# Run by each one-shot process: the work a fresh compile pays for, imports included
+ONE_SHOT = "import sys; from BatchCompiler import compileFile; compileFile(sys.argv[1])"
+
+
+def oneProcessPerFile(paths):
+    """
+    @return requests/s compiling each file in a new interpreter
+    """
+    start = time.perf_counter()
+    for path in paths:
+        subprocess.run([sys.executable, "-c", ONE_SHOT, path], cwd=ROOT, check=True)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def throughServer(client, sources):
+    """
+    @return requests/s compiling every source through the server, pipelined on one connection
+    """
+    start = time.perf_counter()
+    responses = client.pipeline([{"source": source} for source in sources])
+    seconds = time.perf_counter() - start
+    assert all(response["ok"] for response in responses)
+    return len(sources) / seconds
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    workers = sys.argv[2] if len(sys.argv) > 2 else "0"
+    sources = [render(tokens) for tokens in JackGenerator(0).generateProgram(count, subroutines=3)]
+
+    directory = tempfile.mkdtemp(prefix="compile-server-")
+    socketPath = os.path.join(directory, "server.sock")
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "CompileServer.py"), socketPath, workers])
+    try:
+        paths = []
+        for i, source in enumerate(sources):
+            paths.append(os.path.join(directory, "Class%d.jack" % i))
+            with open(paths[-1], "w") as file:
+                file.write(source)
+
+        print("one process per file  %8.1f requests/s" % oneProcessPerFile(paths))
+
+        while not os.path.exists(socketPath):
+            time.sleep(0.01)
+        with CompileClient(socketPath) as client:
+            print("server, cold cache    %8.1f requests/s" % throughServer(client, sources))
+            print("server, warm cache    %8.1f requests/s" % throughServer(client, sources))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory)
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of the cost of one lookahead decision in CompilerParser:
+the original chains of have() calls against the dispatch tables.
+
+Usage: python benchmarks/dispatch.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from CompilerParser import CompilerParser, BODY_HANDLERS
+from ParseTree import Token
+
+
+def chainStatementType(parser):
+    if parser.have(None, "let"):
+        return "let"
+    elif parser.have(None, "if"):
+        return "if"
+    elif parser.have(None, "while"):
+        return "while"
+    elif parser.have(None, "do"):
+        return "do"
+    elif parser.have(None, "return"):
+        return "return"
+
+
+def chainVarType(parser):
+    if parser.have(None, "int"):
+        return "int"
+    elif parser.have(None, "char"):
+        return "char"
+    elif parser.have(None, "boolean"):
+        return "boolean"
+    elif parser.have(None, "void"):
+        return "void"
+
+
+def chainBodyEntry(parser):
+    if parser.have("keyword", "var"):
+        return "compileVarDec"
+    elif parser.have("keyword", "let") or parser.have("keyword", "if") or parser.have("keyword", "while") or parser.have("keyword", "do") or parser.have("keyword", "return"):
+        return "compileStatements"
+
+
+def tableBodyEntry(parser):
+    return BODY_HANDLERS.get(parser.currentKeyword())
+
+
+CASES = [
+    ("statement type", chainStatementType, CompilerParser.checkStatementType, ["let", "return"]),
+    ("var type", chainVarType, CompilerParser.varTypeCheck, ["int", "void"]),
+    ("body entry", chainBodyEntry, tableBodyEntry, ["var", "return"]),
+]
+
+
+if __name__ == "__main__":
+    number = 200000
+    print("%-16s %-8s %10s %10s" % ("decision", "token", "chain ns", "table ns"))
+    for name, chain, table, keywords in CASES:
+        for keyword in keywords:
+            parser = CompilerParser([Token("keyword", keyword)])
+            before = min(timeit.repeat(lambda: chain(parser), number=number, repeat=5)) / number
+            after = min(timeit.repeat(lambda: table(parser), number=number, repeat=5)) / number
+            print("%-16s %-8s %10.0f %10.0f" % (name, keyword, before * 1e9, after * 1e9))
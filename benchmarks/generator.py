@@ -0,0 +1,176 @@
+"""
+Seeded generator of valid Jack programs for benchmarking CompilerParser.
+Programs are produced as token lists, and can be rendered back to source text.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ParseTree import makeToken
+
+
+VAR_TYPES = ["int", "char", "boolean"]
+OPERATORS = ["+", "-", "*", "/", "&", "|", "<", ">", "="]
+
+
+class JackGenerator():
+
+    def __init__(self, seed=0):
+        """
+        Generates Jack classes that CompilerParser accepts
+        @param seed Seed for the random choices, so runs are repeatable
+        """
+        self.random = random.Random(seed)
+        self.tokens = []
+
+
+    def generateClass(self, name="Main", classVars=4, subroutines=4, statements=8, depth=1, expressionLength=3):
+        """
+        Generate the tokens of one class
+        @param name The class name
+        @param classVars Number of names declared in each of the static and field lists
+        @param subroutines Number of subroutines
+        @param statements Number of statements in each block
+        @param depth How deeply if/while blocks nest inside each subroutine
+        @param expressionLength Number of terms in each expression
+        @return a list of Tokens
+        """
+        self.tokens = []
+        self.emit("keyword", "class")
+        self.emit("identifier", name)
+        self.emit("symbol", "{")
+        for kind in ("static", "field"):
+            self.emit("keyword", kind)
+            self.emit("keyword", self.random.choice(VAR_TYPES))
+            for i in range(classVars):
+                if i:
+                    self.emit("symbol", ",")
+                self.emit("identifier", "%s%d" % (kind, i))
+            self.emit("symbol", ";")
+        for i in range(subroutines):
+            self.subroutine("sub%d" % i, statements, depth, expressionLength)
+        self.emit("symbol", "}")
+        return self.tokens
+
+
+    def generateProgram(self, classes=1, **shape):
+        """
+        Generate the tokens of several classes
+        @param classes Number of classes
+        @param shape Keyword arguments for generateClass
+        @return a list of token lists, one per class
+        """
+        return [self.generateClass("Class%d" % i, **shape) for i in range(classes)]
+
+
+    def emit(self, tokenType, value):
+        """
+        Append a token to the class being generated
+        """
+        self.tokens.append(makeToken(tokenType, value))
+
+
+    def subroutine(self, name, statements, depth, expressionLength):
+        """
+        Generate a subroutine whose body nests `depth` if/while blocks
+        """
+        self.emit("keyword", self.random.choice(["function", "method"]))
+        self.emit("keyword", self.random.choice(VAR_TYPES + ["void"]))
+        self.emit("identifier", name)
+        self.emit("symbol", "(")
+        self.emit("keyword", "int")
+        self.emit("identifier", "a")
+        self.emit("symbol", ",")
+        self.emit("keyword", "boolean")
+        self.emit("identifier", "b")
+        self.emit("symbol", ")")
+        self.emit("symbol", "{")
+        self.emit("keyword", "var")
+        self.emit("keyword", "int")
+        self.emit("identifier", "i")
+        self.emit("symbol", ";")
+
+        # Nest blocks iteratively so very deep programs can be generated
+        for level in range(depth):
+            self.statements(statements - 1, expressionLength)
+            self.emit("keyword", self.random.choice(["if", "while"]))
+            self.emit("symbol", "(")
+            self.expression(expressionLength)
+            self.emit("symbol", ")")
+            self.emit("symbol", "{")
+        self.statements(statements, expressionLength)
+        for level in range(depth):
+            self.emit("symbol", "}")
+
+        self.emit("keyword", "return")
+        self.emit("symbol", ";")
+        self.emit("symbol", "}")
+
+
+    def statements(self, count, expressionLength):
+        """
+        Generate a run of let and do statements
+        """
+        for i in range(count):
+            kind = self.random.random()
+            if kind < 0.5:
+                self.emit("keyword", "let")
+                self.emit("identifier", "i")
+                if kind < 0.1:
+                    self.emit("symbol", "[")
+                    self.expression(1)
+                    self.emit("symbol", "]")
+                self.emit("symbol", "=")
+                self.expression(expressionLength)
+                self.emit("symbol", ";")
+            else:
+                self.emit("keyword", "do")
+                self.emit("identifier", "Output")
+                self.emit("symbol", ".")
+                self.emit("identifier", "print")
+                self.emit("symbol", "(")
+                self.expression(expressionLength)
+                self.emit("symbol", ",")
+                self.emit("stringConstant", "s%d" % i)
+                self.emit("symbol", ")")
+                self.emit("symbol", ";")
+
+
+    def expression(self, length):
+        """
+        Generate an expression of `length` terms
+        """
+        for i in range(length):
+            if i:
+                self.emit("symbol", self.random.choice(OPERATORS))
+            kind = self.random.random()
+            if kind < 0.3:
+                self.emit("integerConstant", str(self.random.randrange(32768)))
+            elif kind < 0.4:
+                self.emit("symbol", "-")
+                self.emit("identifier", "a")
+            elif kind < 0.5:
+                self.emit("symbol", "(")
+                self.emit("identifier", "b")
+                self.emit("symbol", ")")
+            elif kind < 0.6:
+                self.emit("keyword", self.random.choice(["true", "false", "null", "this"]))
+            else:
+                self.emit("identifier", self.random.choice(["a", "i", "static0", "field0"]))
+
+
+def render(tokens):
+    """
+    Turn a token list back into Jack source text
+    @param tokens A list of Tokens
+    @return the source, one space between tokens
+    """
+    words = []
+    for token in tokens:
+        if token.getType() == "stringConstant":
+            words.append('"' + token.getValue() + '"')
+        else:
+            words.append(token.getValue())
+    return " ".join(words)
@@ -0,0 +1,64 @@
+"""
+Compares the memory used per parse tree node by the slotted ParseTree/Token
+classes against the original dict-backed classes.
+
+Usage: python benchmarks/node_memory.py [leaves]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ParseTree import ParseTree, makeToken
+
+
+class LegacyParseTree():
+
+    def __init__(self, node_type, value):
+        self.node_type = node_type
+        self.value = value
+        self.children = []
+
+    def addChild(self, child):
+        self.children.append(child)
+
+
+class LegacyToken(LegacyParseTree):
+    pass
+
+
+def buildTree(treeType, tokenFactory, leaves):
+    """
+    Build a classVarDec-shaped tree: one node per four leaves
+    @return the root of the tree
+    """
+    root = treeType("class", None)
+    for i in range(leaves // 4):
+        node = treeType("classVarDec", None)
+        node.addChild(tokenFactory("keyword", "static"))
+        node.addChild(tokenFactory("keyword", "int"))
+        node.addChild(tokenFactory("identifier", "a"))
+        node.addChild(tokenFactory("symbol", ";"))
+        root.addChild(node)
+    return root
+
+
+def measure(treeType, tokenFactory, leaves):
+    """
+    @return bytes allocated per node while building a tree
+    """
+    tracemalloc.start()
+    tree = buildTree(treeType, tokenFactory, leaves)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = 1 + (leaves // 4) * 5
+    return used / nodes
+
+
+if __name__ == "__main__":
+    leaves = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+    legacy = measure(LegacyParseTree, LegacyToken, leaves)
+    compact = measure(ParseTree, makeToken, leaves)
+    print("legacy  %6.1f bytes/node" % legacy)
+    print("compact %6.1f bytes/node (%.0f%% of legacy)" % (compact, 100 * compact / legacy))
@@ -0,0 +1,29 @@
+"""
+Compares a cold batch compile, which parses every file and fills a
+ParseCache, with warm compiles served from disk and from memory.
+
+Usage: python benchmarks/parse_cache.py <directory of .jack files>
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from BatchCompiler import BatchCompiler
+from ParseCache import ParseCache
+
+
+if __name__ == "__main__":
+    sources = sys.argv[1]
+    directory = tempfile.mkdtemp(prefix="parse-cache-")
+    try:
+        cache = ParseCache(directory, capacity=100000)
+        print("cold         ", BatchCompiler(0, cache=cache).compile(sources), cache.stats())
+
+        cache = ParseCache(directory, capacity=100000)
+        print("warm (disk)  ", BatchCompiler(0, cache=cache).compile(sources), cache.stats())
+        print("warm (memory)", BatchCompiler(0, cache=cache).compile(sources), cache.stats())
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,134 @@
+"""
+Parser benchmark suite. For each program shape it measures tokenizing the
+rendered source, compileProgram, and ParseTree serialisation, reporting
+tokens/s and peak memory.
+
+Usage: python benchmarks/run.py [--scale N] [--seed N] [--json results.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from CompilerParser import CompilerParser
+from JackTokenizer import JackTokenizer
+from generator import JackGenerator, render
+
+
+# name -> generateProgram arguments for scale 1
+SHAPES = {
+    "many-classes": dict(classes=200, classVars=2, subroutines=3, statements=4, depth=1),
+    "wide-class-vars": dict(classes=1, classVars=20000, subroutines=1, statements=1, depth=0),
+    "deep-nesting": dict(classes=1, classVars=1, subroutines=1, statements=1, depth=3000),
+    "long-statements": dict(classes=1, classVars=1, subroutines=2, statements=10000, depth=0),
+    "long-expressions": dict(classes=1, classVars=1, subroutines=10, statements=20, depth=0, expressionLength=500),
+}
+
+# Shape arguments multiplied by --scale
+SCALED = ("classes", "classVars", "statements", "depth", "expressionLength")
+
+
+class NullWriter():
+
+    def write(self, text):
+        """
+        Discard serialised output so only the cost of producing it is measured
+        """
+        pass
+
+
+def measure(function):
+    """
+    Run a function twice: once timed, once under tracemalloc
+    @return (seconds, peak bytes allocated)
+    """
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def runShape(name, shape, seed):
+    """
+    Benchmark one program shape
+    @return a list of result dicts, one per stage
+    """
+    programs = JackGenerator(seed).generateProgram(**shape)
+    sources = [render(tokens) for tokens in programs]
+    tokenCount = sum(len(tokens) for tokens in programs)
+    # Deep programs need the explicit-stack parser
+    iterative = shape.get("depth", 0) > 100
+
+    def tokenize():
+        for source in sources:
+            for token in JackTokenizer(io.StringIO(source)):
+                pass
+
+    def parse():
+        return [CompilerParser(tokens, iterative).compileProgram() for tokens in programs]
+
+    trees = parse()
+
+    def serialise():
+        writer = NullWriter()
+        for tree in trees:
+            tree.writeTo(writer)
+
+    results = []
+    for stage, function in (("tokenize", tokenize), ("compileProgram", parse), ("serialise", serialise)):
+        seconds, peak = measure(function)
+        results.append({
+            "shape": name,
+            "stage": stage,
+            "tokens": tokenCount,
+            "seconds": seconds,
+            "tokensPerSecond": tokenCount / seconds if seconds else None,
+            "peakBytes": peak,
+        })
+    return results
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument("--scale", type=float, default=1.0, help="multiply program sizes by this")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--shape", action="append", choices=sorted(SHAPES), help="only run these shapes")
+    arguments.add_argument("--json", help="also write results to this file")
+    options = arguments.parse_args()
+
+    results = []
+    print("%-17s %-15s %9s %9s %12s %10s" % ("shape", "stage", "tokens", "seconds", "tokens/s", "peak MB"))
+    for name in options.shape or SHAPES:
+        shape = dict(SHAPES[name])
+        for key in SCALED:
+            if key in shape:
+                shape[key] = max(1 if shape[key] else 0, int(shape[key] * options.scale))
+        for result in runShape(name, shape, options.seed):
+            results.append(result)
+            print("%-17s %-15s %9d %9.3f %12.0f %10.2f" % (
+                result["shape"], result["stage"], result["tokens"], result["seconds"],
+                result["tokensPerSecond"] or 0, result["peakBytes"] / 1e6))
+
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "seed": options.seed,
+                "scale": options.scale,
+                "results": results,
+            }, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compares a naive scanner that builds each token a character at a time with
+JackTokenizer, which classifies whole chunks with one regex, and with
+classifying into a TokenTable without making any Token objects.
+
+Usage: python benchmarks/tokenizer.py [file.jack]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from JackTokenizer import JackTokenizer, KEYWORDS
+from ParseTree import Token
+from generator import JackGenerator, render
+
+
+SYMBOLS = "{}()[].,;+-*/&|<>=~"
+
+
+def naiveTokens(text):
+    """
+    Scan text one character at a time, as a hand-written tokenizer would
+    @return a list of Tokens
+    """
+    tokens = []
+    i = 0
+    length = len(text)
+    while i < length:
+        character = text[i]
+        if character.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            while i < length and text[i] != "\n":
+                i += 1
+        elif text.startswith("/*", i):
+            i += 2
+            while not text.startswith("*/", i):
+                i += 1
+            i += 2
+        elif character in SYMBOLS:
+            tokens.append(Token("symbol", character))
+            i += 1
+        elif character.isdigit():
+            value = ""
+            while i < length and text[i].isdigit():
+                value += text[i]
+                i += 1
+            tokens.append(Token("integerConstant", value))
+        elif character == '"':
+            value = ""
+            i += 1
+            while text[i] != '"':
+                value += text[i]
+                i += 1
+            i += 1
+            tokens.append(Token("stringConstant", value))
+        else:
+            value = ""
+            while i < length and (text[i].isalnum() or text[i] == "_"):
+                value += text[i]
+                i += 1
+            tokens.append(Token("keyword" if value in KEYWORDS else "identifier", value))
+    return tokens
+
+
+def best(function, repeats=3):
+    """
+    @return the fastest of several timed runs, in seconds
+    """
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as file:
+            text = file.read()
+    else:
+        text = "\n".join(render(tokens) for tokens in JackGenerator(0).generateProgram(200, subroutines=8))
+
+    count = len(naiveTokens(text))
+    runs = [
+        ("naive per-character", lambda: naiveTokens(text)),
+        ("JackTokenizer", lambda: list(JackTokenizer(io.StringIO(text)))),
+        ("TokenTable only", lambda: JackTokenizer(io.StringIO(text)).tokenTable()),
+    ]
+    for name, function in runs:
+        seconds = best(function)
+        print("%-20s %7.3fs  %10.0f tokens/s" % (name, seconds, count / seconds))
@@ -0,0 +1,39 @@
+"""
+Compares building a parse tree of ParseTree objects with building it in a
+TreeArena: parse time and the memory the finished tree holds on to.
+
+Usage: python benchmarks/tree_arena.py <file.jack>
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from CompilerParser import CompilerParser
+from JackTokenizer import JackTokenizer
+from TreeArena import TreeArena
+
+
+def measure(path, arena):
+    """
+    Parse a file, streaming its tokens so only the tree is left allocated afterwards
+    @return (seconds, bytes held by the tree, nodes)
+    """
+    start = time.perf_counter()
+    CompilerParser(JackTokenizer(path), builder=arena).compileProgram()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    tree = CompilerParser(JackTokenizer(path), builder=arena and TreeArena()).compileProgram()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = len(tree.arena) if arena else sum(1 for node in tree.walk())
+    return seconds, held, nodes
+
+
+if __name__ == "__main__":
+    for name, arena in (("objects", None), ("arena", TreeArena())):
+        seconds, held, nodes = measure(sys.argv[1], arena)
+        print("%-8s %7.3fs  %6.1f bytes/node  (%d nodes)" % (name, seconds, held / nodes, nodes))
@@ -0,0 +1,117 @@
+"""
+Checks IncrementalParser against a full reparse after random token edits.
+
+Usage: python -m pytest tests
+"""
+import io
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from CompilerParser import CompilerParser
+from IncrementalParser import IncrementalParser
+from JackTokenizer import JackTokenizer
+from ParseTree import ParseException
+
+
+SOURCE = """
+class Main {
+    field int x, y;
+    static boolean done;
+    function void init(int ax, int ay) {
+        var int i;
+        let x = ax;
+        let i = 0;
+        while (i < ay) {
+            if (x > i) { let x = x - 1; } else { do Output.printInt(x); }
+            let i = i + 1;
+        }
+        return;
+    }
+    method int sum(int n) {
+        var int a;
+        let a[n] = a[n - 1] + (x * -y) / 2;
+        return a[n];
+    }
+    field char c;
+}
+"""
+
+# Snippets spliced in by the random edits; most keep the class valid, some break it
+SNIPPETS = ["x", "y", "1", "x + 1", "let x = 2;", "do f();", "return;", ";", "x , , y", "{", "}", "if"]
+
+RENAMES = {"identifier": ["x", "y", "n", "i"], "integerConstant": ["0", "7", "42"]}
+
+
+def tokenize(text):
+    """
+    @return a list of the tokens in text
+    """
+    return list(JackTokenizer(io.StringIO(text)))
+
+
+def fullParse(tokens):
+    """
+    @return the ParseTree of the tokens parsed from scratch, or None if they don't parse
+    """
+    try:
+        return CompilerParser(list(tokens)).compileProgram()
+    except ParseException:
+        return None
+
+
+class IncrementalParserTest(unittest.TestCase):
+
+    def checkEdit(self, parser, start, end, newTokens):
+        """
+        Apply an edit and check the result against a full reparse of the edited tokens
+        """
+        before = list(parser.tokens)
+        expected = fullParse(before[:start] + newTokens + before[end:])
+        if expected is None:
+            self.assertRaises(ParseException, parser.update, start, end, newTokens)
+            self.assertEqual(parser.tokens, before)
+        else:
+            self.assertTrue(parser.update(start, end, newTokens).equals(expected))
+        self.assertTrue(parser.getTree().equals(fullParse(parser.tokens)))
+
+
+    def testRandomEdits(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            parser = IncrementalParser(tokenize(SOURCE))
+            for edit in range(40):
+                start = rng.randrange(len(parser.tokens))
+                token = parser.tokens[start]
+                if rng.random() < 0.6 and token.node_type in RENAMES:
+                    # Swapping a name or number for another keeps the class valid
+                    self.checkEdit(parser, start, start + 1, tokenize(rng.choice(RENAMES[token.node_type])))
+                else:
+                    end = min(len(parser.tokens), start + rng.randrange(3))
+                    self.checkEdit(parser, start, end, tokenize(rng.choice(SNIPPETS)))
+
+
+    def testEditAfterFailedEdit(self):
+        parser = IncrementalParser(tokenize("class A { field int a; field int b; field int c; field int d; }"))
+        self.assertRaises(ParseException, parser.update, 5, 5, tokenize("x , , y"))
+        tree = parser.update(13, 14, tokenize("z"))
+        edited = tokenize("class A { field int a; field int b; field int z; field int d; }")
+        self.assertEqual([token.value for token in parser.tokens], [token.value for token in edited])
+        self.assertTrue(tree.equals(fullParse(edited)))
+
+
+    def testIncrementalReuse(self):
+        parser = IncrementalParser(tokenize(SOURCE))
+        old = parser.getTree()
+        index = [token.value for token in parser.tokens].index("ax", 30)
+        self.checkEdit(parser, index, index + 1, tokenize("ay"))
+        self.assertTrue(parser.incremental)
+        # Members the edit didn't touch are shared with the old tree
+        self.assertIs(parser.getTree().getChildren()[3], old.getChildren()[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Checks CompilerParser's explicit-stack mode on deeply nested code, and that it agrees with the
+recursive mode wherever that can run.
+
+Usage: python -m pytest tests
+"""
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from CompilerParser import CompilerParser
+from JackTokenizer import JackTokenizer
+
+
+DEPTH = 12000
+
+SAMPLE = """
+class Main {
+    field int x, y;
+    static boolean done;
+    method int sum(int n) {
+        var int i;
+        let i = 0;
+        while (i < n) {
+            if (~done & (x > i)) { let x = x - (i * -y); } else { do Output.printInt(x); }
+            let i = i + 1;
+        }
+        return i;
+    }
+}
+"""
+
+
+def nestedBlocks(depth):
+    """
+    @return a class whose subroutine nests depth if and while blocks, alternating
+    """
+    opens = []
+    for i in range(depth):
+        opens.append("if (x) { " if i % 2 else "while (x < 1) { ")
+    return "class Main { function void f() { %slet x = 1; %s return; } }" % ("".join(opens), "} " * depth)
+
+
+def nestedExpression(depth):
+    """
+    @return a class whose subroutine assigns an expression nested in depth parentheses
+    """
+    return "class Main { function void f() { let x = %sx + 1%s; return; } }" % ("(" * depth, ")" * depth)
+
+
+def parse(text, iterative):
+    """
+    @return the ParseTree of text
+    """
+    return CompilerParser(JackTokenizer(io.StringIO(text)), iterative).compileProgram()
+
+
+class IterativeParserTest(unittest.TestCase):
+
+    def checkDeep(self, text):
+        """
+        Parse text iteratively and check that the tree can be walked, measured and compared
+        """
+        tree = parse(text, True)
+        nodes = sum(1 for node in tree.walk())
+        self.assertGreater(nodes, DEPTH)
+        self.assertGreater(tree.height(), DEPTH)
+        self.assertTrue(tree.equals(parse(text, True)))
+        return tree
+
+
+    def testNestedBlocks(self):
+        tree = self.checkDeep(nestedBlocks(DEPTH))
+        types = [node.node_type for node in tree.walk()]
+        self.assertEqual(types.count("whileStatement"), DEPTH // 2)
+        self.assertEqual(types.count("ifStatement"), DEPTH // 2)
+
+
+    def testNestedExpression(self):
+        self.checkDeep(nestedExpression(DEPTH))
+
+
+    def testDifferentTreesDiffer(self):
+        self.assertFalse(parse(nestedBlocks(DEPTH), True).equals(parse(nestedBlocks(DEPTH - 2), True)))
+
+
+    def testModesAgree(self):
+        for text in [nestedBlocks(20), nestedExpression(20), SAMPLE]:
+            recursive = parse(text, False)
+            iterative = parse(text, True)
+            self.assertTrue(recursive.equals(iterative))
+            self.assertEqual(str(recursive), str(iterative))
+
+
+if __name__ == "__main__":
+    unittest.main()